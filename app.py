@@ -1,20 +1,148 @@
-from flask import Flask, render_template
-import json
+from flask import Flask, abort, jsonify, make_response, render_template, request, url_for
+import hashlib
+import hmac
 import os
+import threading
+import tracemalloc
 from datetime import datetime
 
+import frames
+import payload
+import profiling
+import store
+from page_cache import PageCache
+
 app = Flask(__name__)
 
 DATA_FILE = os.environ.get("DINKYDASH_DATA_FILE", "dashboard_data.json")
 
+# When set, dashboards are read from the generations store instead of
+# DATA_FILE. FAMILY_ID picks which family the bare `/` route shows.
+DB_FILE = os.environ.get("DINKYDASH_DB")
+FAMILY_ID = os.environ.get("DINKYDASH_FAMILY", "default")
+
+# Rendered /s/<token> pages, bounded by total size so thousands of screens
+# can't grow the process without limit.
+PAGE_CACHE_BYTES = int(os.environ.get("DINKYDASH_PAGE_CACHE_BYTES", 32 * 1024 * 1024))
+
+# Enables the /debug/ profiling endpoints, which must send it in an
+# X-Debug-Token header. Unset, they 404.
+DEBUG_TOKEN = os.environ.get("DINKYDASH_DEBUG_TOKEN")
+MAX_PROFILE_SECONDS = 60
+
+# Where generate.py writes the PNG frames (its frame_dir setting).
+FRAME_DIR = os.environ.get("DINKYDASH_FRAME_DIR", "frames")
+
+# Files every screen needs, precached by the service worker (templates/sw.js).
+SHELL_FILES = ["favicon.svg", "icon.png"]
+
+_local = threading.local()
+_payload = (None, None)
+page_cache = PageCache(PAGE_CACHE_BYTES)
+_token_families = {}
+_watch = {"conn": None, "version": None}
+_watch_lock = threading.Lock()
+
+
+def get_db():
+    """Return this thread's store connection, opening it on first use."""
+    conn = getattr(_local, "db", None)
+    if conn is None:
+        conn = _local.db = store.connect(DB_FILE)
+    return conn
+
+
+def check_for_new_generations():
+    """Drop cached pages and token lookups once anything new is committed.
+
+    Uses one shared connection so a single commit clears the cache once,
+    rather than once per request thread noticing it on its own connection.
+    Returns the data version the caches now match.
+    """
+    with _watch_lock:
+        if _watch["conn"] is None:
+            _watch["conn"] = store.connect(DB_FILE, check_same_thread=False)
+        version = store.data_version(_watch["conn"])
+        if version != _watch["version"]:
+            _watch["version"] = version
+            page_cache.invalidate()
+            _token_families.clear()
+        return version
+
+
+def cache_page(family_id, body, seen_version):
+    """Cache a page rendered from data read at `seen_version`.
+
+    Skipped if anything was committed since: the page may predate it, and
+    nothing would invalidate it again until the next commit. Checked under
+    the watch lock so an invalidation can't slip in before the put.
+    """
+    with _watch_lock:
+        if store.data_version(_watch["conn"]) == seen_version == _watch["version"]:
+            page_cache.put(family_id, body)
+
 
 def load_dashboard_data():
-    """Load the pre-generated dashboard data JSON."""
+    """Load the pre-generated dashboard data for FAMILY_ID."""
+    global _payload
+    if DB_FILE:
+        return store.latest_payload(get_db(), FAMILY_ID)
+    # generate.py replaces the file by rename, so a stat is enough to notice
+    # a new payload; the file is only parsed again when it has changed.
+    try:
+        st = os.stat(DATA_FILE)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached_stamp, cached_data = _payload
+    if stamp == cached_stamp:
+        return cached_data
     try:
-        with open(DATA_FILE) as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        data = payload.load(DATA_FILE)
+    except (OSError, ValueError):
         return None
+    _payload = (stamp, data)
+    return data
+
+
+def _shell_version():
+    """Hash of everything the service worker precaches or serves, so a
+    deploy that changes any of it installs a new worker."""
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(root, "templates", name) for name in ("index.html", "sw.js")]
+    paths += [os.path.join(root, "static", name) for name in SHELL_FILES]
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+SHELL_VERSION = _shell_version()
+
+
+def dashboard_response(body, is_dashboard, headers=None):
+    """A rendered dashboard, with an ETag so the service worker's background
+    checks cost a 304 until it changes. The waiting page gets none: it shows
+    the current time and must never be kept as the last good dashboard."""
+    response = make_response(body, headers or {})
+    if is_dashboard:
+        response.add_etag()
+        response.headers["Cache-Control"] = "no-cache"
+        response.make_conditional(request)
+    return response
+
+
+def warm_up():
+    """Compile the dashboard template and load the current payload.
+
+    Called by wsgi.py before the server forks its workers, so they start
+    with this work already done and share the memory copy-on-write. The
+    store is left alone: SQLite connections must not cross a fork.
+    """
+    app.jinja_env.get_template("index.html")
+    if not DB_FILE:
+        load_dashboard_data()
 
 
 @app.route("/")
@@ -23,7 +151,150 @@ def index():
     today = datetime.now().strftime("%A, %B %d")
     if data:
         today = data.get("today_display", today)
-    return render_template("index.html", data=data, today=today)
+    body = render_template("index.html", data=data, today=today)
+    return dashboard_response(body, bool(data))
+
+
+def family_for_screen(token):
+    """The family a screen token belongs to; 404s for unknown tokens."""
+    if not DB_FILE:
+        abort(404)
+    check_for_new_generations()
+
+    family_id = _token_families.get(token)
+    if family_id is None:
+        family_id = store.family_for_token(get_db(), token)
+        if family_id is None:
+            abort(404)
+        _token_families[token] = family_id
+    return family_id
+
+
+@app.route("/s/<token>")
+def screen(token):
+    """Serve the dashboard for the family a screen token belongs to."""
+    family_id = family_for_screen(token)
+    seen_version = check_for_new_generations()
+    body = page_cache.get(family_id)
+    # Only real dashboards are cached, so a cached page is one.
+    is_dashboard = body is not None
+    if body is None:
+        data = store.latest_payload(get_db(), family_id)
+        today = datetime.now().strftime("%A, %B %d")
+        if data:
+            today = data.get("today_display", today)
+        body = render_template("index.html", data=data, today=today).encode()
+        # The waiting page embeds the current time; only cache real dashboards.
+        is_dashboard = bool(data)
+        if is_dashboard:
+            cache_page(family_id, body, seen_version)
+
+    return dashboard_response(body, is_dashboard, {
+        "Content-Type": "text/html; charset=utf-8",
+        # Screen URLs are bearer tokens: keep them out of indexes and referrers.
+        "X-Robots-Tag": "noindex",
+        "Referrer-Policy": "no-referrer",
+    })
+
+
+@app.route("/sw.js")
+def service_worker():
+    """The service worker, served from the root so it controls every page."""
+    body = render_template(
+        "sw.js", version=SHELL_VERSION,
+        precache=[url_for("static", filename=name) for name in SHELL_FILES],
+    )
+    return body, {"Content-Type": "text/javascript; charset=utf-8",
+                  "Cache-Control": "no-cache"}
+
+
+def frame_response(family_id, spec):
+    """A dashboard frame PNG, or 304 if the client already has it.
+
+    When the frame replaced one the client may still be showing,
+    X-Frame-Diff-Base names that frame's ETag and X-Frame-Diff the
+    changed rectangle as left,top,right,bottom (empty: nothing changed).
+    """
+    try:
+        frames.parse_spec(spec)
+    except ValueError:
+        abort(404)
+    meta = frames.read_meta(FRAME_DIR, family_id, spec)
+    # generate.py writes the PNG before its metadata, so a matching
+    # metadata ETag means the client is current without reading the PNG.
+    if meta and request.if_none_match.contains(meta["etag"]):
+        return "", 304, {"ETag": f'"{meta["etag"]}"', "Cache-Control": "no-cache"}
+    try:
+        body = frames.frame_path(FRAME_DIR, family_id, spec).read_bytes()
+    except OSError:
+        abort(404)
+    etag = frames.frame_etag(body)
+    headers = {"Content-Type": "image/png", "ETag": f'"{etag}"',
+               "Cache-Control": "no-cache"}
+    # Only describe the change when the metadata belongs to this PNG.
+    if meta and meta.get("etag") == etag and meta.get("previous_etag"):
+        headers["X-Frame-Diff-Base"] = meta["previous_etag"]
+        headers["X-Frame-Diff"] = ",".join(map(str, meta["diff"] or ()))
+    if request.if_none_match.contains(etag):
+        return "", 304, headers
+    return body, headers
+
+
+@app.route("/frame/<spec>.png")
+def frame(spec):
+    """FAMILY_ID's dashboard as a PNG, e.g. /frame/800x480-1bit.png."""
+    return frame_response(FAMILY_ID, spec)
+
+
+@app.route("/s/<token>/frame/<spec>.png")
+def screen_frame(token, spec):
+    """A screen's dashboard as a PNG, for displays without a browser."""
+    return frame_response(family_for_screen(token), spec)
+
+
+def require_debug_token():
+    if not DEBUG_TOKEN:
+        abort(404)
+    given = request.headers.get("X-Debug-Token", "")
+    if not hmac.compare_digest(given.encode(), DEBUG_TOKEN.encode()):
+        abort(403)
+
+
+@app.route("/debug/cache-stats")
+def cache_stats():
+    """Hit/miss/eviction counters for the rendered-page cache."""
+    require_debug_token()
+    return jsonify(page_cache.stats())
+
+
+@app.route("/debug/profile")
+def debug_profile():
+    """Sample what this worker's other threads run for ?seconds=N (max 60)."""
+    require_debug_token()
+    seconds = min(request.args.get("seconds", 10, type=float), MAX_PROFILE_SECONDS)
+    stacks = profiling.sample_stacks(seconds)
+    if request.args.get("format") == "folded":
+        body = profiling.format_folded(stacks)
+    else:
+        body = profiling.format_samples(stacks, top=request.args.get("top", 30, type=int))
+    return body, {"Content-Type": "text/plain; charset=utf-8"}
+
+
+@app.route("/debug/memory")
+def debug_memory():
+    """Memory by allocation site; ?start=1 / ?stop=1 switch tracing."""
+    require_debug_token()
+    if request.args.get("start"):
+        tracemalloc.start(profiling.TRACEMALLOC_FRAMES)
+    elif request.args.get("stop"):
+        tracemalloc.stop()
+        return "tracemalloc stopped\n", {"Content-Type": "text/plain"}
+    body = profiling.memory_report(top=request.args.get("top", 25, type=int))
+    if body is None:
+        return ("tracemalloc is off: start the server with PYTHONTRACEMALLOC=1, "
+                "or request /debug/memory?start=1 and come back later\n",
+                409, {"Content-Type": "text/plain"})
+    return body, {"Content-Type": "text/plain; charset=utf-8"}
 
 
 @app.route("/preview")
@@ -0,0 +1,345 @@
+"""
+Validated, pre-parsed config for generate.py
+
+config.yaml is checked against the schema below before any work starts, so
+a typo fails the run straight away with every problem listed by where it
+is, instead of as a KeyError halfway through building the prompt after the
+calendar fetch has already been paid for. Dates of birth become `date`
+objects and special dates get a (month, day) pair, so the countdown code
+never parses strings.
+
+The compiled result is cached as a pickle in cache_dir, one file per config
+path, holding the YAML's SHA-256. A run whose config has the same mtime and
+size as last time loads the pickle without even reading the YAML; if only
+the stat changed, the hash decides. Both cost far less than YAML parsing,
+which matters once one host generates for thousands of families. The cache
+is only ever read from the machine's own disk: pickles must never come
+from anywhere else.
+
+Each pickle also records a hash of the code that validates and compiles
+configs, so a schema change (here or in frames.py or payload.py) recompiles
+and revalidates every config. Checks that depend on the machine rather than
+the file, like whether msgpack is installed, run on every load.
+"""
+
+import difflib
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+import yaml
+
+import frames
+import payload
+
+log = logging.getLogger(__name__)
+
+# The modules whose code decides what a valid, compiled config is. Their
+# combined hash keys the cache, so nobody has to remember to bump a version.
+SCHEMA_SOURCES = (__file__, frames.__file__, payload.__file__)
+
+
+def _schema_hash():
+    digest = hashlib.sha256()
+    for source in SCHEMA_SOURCES:
+        digest.update(Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+SCHEMA_HASH = _schema_hash()
+
+
+class ConfigError(ValueError):
+    """The config doesn't match the schema; `problems` lists every issue."""
+
+    def __init__(self, source, problems):
+        self.problems = problems
+        super().__init__(f"{source}: " + "; ".join(problems))
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+def _str(value):
+    return isinstance(value, str)
+
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _non_negative_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _positive_number(value):
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and value > 0)
+
+
+def _str_list(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _str_or_str_list(value):
+    return _str(value) or _str_list(value)
+
+
+def _frame_specs(value):
+    if not _str_list(value):
+        return False
+    try:
+        for spec in value:
+            frames.parse_spec(spec)
+    except ValueError:
+        return False
+    return True
+
+
+# Top-level scalar keys: check, and what the message calls a valid value.
+# people, pets, recurring and special_dates are checked field by field below.
+SCALARS = {
+    "location": (_str, "a string"),
+    "calendar_url": (_str, "a string"),
+    "calendar_urls": (_str_or_str_list, "a list of URLs"),
+    "calendar_filter_emails": (_str_list, "a list of email addresses"),
+    "calendar_max_events": (_positive_int, "a positive integer"),
+    "calendar_timeout": (_positive_number, "a positive number of seconds"),
+    "calendar_cache_dir": (_str, "a path"),
+    "generation_deadline_seconds": (_positive_number, "a positive number of seconds"),
+    "avatar_size": (_positive_int, "a positive integer"),
+    "anthropic_api_key_env": (_str, "an environment variable name"),
+    "anthropic_base_url": (_str, "a URL"),
+    "claude_model": (_str, "a model name"),
+    "claude_fallback_models": (_str_list, "a list of model names"),
+    "claude_hedge_after_seconds": (_positive_number, "a positive number of seconds"),
+    "max_tokens": (_positive_int, "a positive integer"),
+    "history_days": (_non_negative_int, "a whole number of days"),
+    "content_history_file": (_str, "a path"),
+    "data_file": (_str, "a path"),
+    "database_file": (_str, "a path"),
+    "family_id": (_str, "a string"),
+    "ledger_file": (_str, "a path"),
+    "frames": (_frame_specs, "a list of frame sizes like 800x480 or 800x480-1bit"),
+    "frame_dir": (_str, "a path"),
+    "frame_font": (_str, "a path to a TrueType font"),
+}
+
+LISTS = ("people", "pets", "recurring", "special_dates")
+
+KNOWN_KEYS = set(SCALARS) | set(LISTS)
+
+
+def _parse_dob(value):
+    """date_of_birth as a date; YAML gives one already when it's unquoted."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    raise ValueError(value)
+
+
+def _parse_month_day(value):
+    """'MM/DD' as a (month, day) pair, checked against a leap year so that
+    02/29 is allowed."""
+    month, day = (int(part) for part in str(value).split("/"))
+    date(2024, month, day)
+    return month, day
+
+
+def _check_fields(entry, where, fields, problems):
+    """Check a list entry's fields; fields maps name -> (required, check, wanted)."""
+    if not isinstance(entry, dict):
+        problems.append(f"{where}: expected a mapping of fields")
+        return False
+    for name, (required, check, wanted) in fields.items():
+        if name not in entry or entry[name] is None:
+            if required:
+                problems.append(f"{where}.{name}: missing")
+        elif not check(entry[name]):
+            problems.append(f"{where}.{name}: expected {wanted}, got {entry[name]!r}")
+    return True
+
+
+PERSON_FIELDS = {
+    "name": (True, lambda v: _str(v) and v.strip(), "a name"),
+    "date_of_birth": (True, lambda v: True, "YYYY-MM-DD"),
+    "sex": (True, _str, "a string"),
+    "image": (False, _str, "an image filename"),
+    "email": (False, _str, "an email address"),
+    "interests": (False, _str, "a string"),
+}
+PET_FIELDS = {
+    "name": (True, _str, "a name"),
+    "type": (True, _str, "an animal, e.g. dog"),
+    "image": (False, _str, "an image filename"),
+}
+CHORE_FIELDS = {
+    "title": (True, _str, "a string"),
+    "emoji": (False, _str, "an emoji"),
+    "choices": (True, lambda v: _str_list(v) and v, "a non-empty list of names"),
+}
+SPECIAL_DATE_FIELDS = {
+    "title": (True, _str, "a string"),
+    "emoji": (False, _str, "an emoji"),
+    "date": (True, lambda v: True, "MM/DD"),
+}
+
+
+def _environment_problems(raw):
+    """Problems that depend on this machine rather than the YAML, so they are
+    checked on every load, cached or not."""
+    data_file = raw.get("data_file")
+    if _str(data_file) and payload.is_msgpack(data_file) and payload.msgpack is None:
+        return ["data_file: writing .msgpack needs the msgpack package "
+                "(pip install msgpack)"]
+    return []
+
+
+def validate(raw):
+    """Return a list of problems with a parsed config; empty means valid."""
+    if not isinstance(raw, dict):
+        return ["expected a mapping of settings at the top level"]
+    problems = []
+
+    for key in sorted(set(raw) - KNOWN_KEYS):
+        close = difflib.get_close_matches(key, KNOWN_KEYS, n=1)
+        hint = f" (did you mean {close[0]}?)" if close else ""
+        log.warning("Unknown config key %r%s", key, hint)
+
+    for key, (check, wanted) in SCALARS.items():
+        if raw.get(key) is not None and not check(raw[key]):
+            problems.append(f"{key}: expected {wanted}, got {raw[key]!r}")
+
+    problems += _environment_problems(raw)
+
+    if not raw.get("people"):
+        problems.append("people: at least one person is required")
+    for key in LISTS:
+        if raw.get(key) is not None and not isinstance(raw[key], list):
+            problems.append(f"{key}: expected a list")
+
+    def entries(key):
+        value = raw.get(key)
+        return enumerate(value) if isinstance(value, list) else ()
+
+    names = set()
+    for i, person in entries("people"):
+        where = f"people[{i}]"
+        if not _check_fields(person, where, PERSON_FIELDS, problems):
+            continue
+        if person.get("name") in names:
+            problems.append(f"{where}.name: {person['name']!r} is listed twice")
+        names.add(person.get("name"))
+        if person.get("date_of_birth") is not None:
+            try:
+                _parse_dob(person["date_of_birth"])
+            except ValueError:
+                problems.append(f"{where}.date_of_birth: expected YYYY-MM-DD, "
+                                f"got {person['date_of_birth']!r}")
+
+    for i, pet in entries("pets"):
+        _check_fields(pet, f"pets[{i}]", PET_FIELDS, problems)
+    for i, chore in entries("recurring"):
+        _check_fields(chore, f"recurring[{i}]", CHORE_FIELDS, problems)
+    for i, sd in entries("special_dates"):
+        where = f"special_dates[{i}]"
+        if _check_fields(sd, where, SPECIAL_DATE_FIELDS, problems) and sd.get("date"):
+            try:
+                _parse_month_day(sd["date"])
+            except ValueError:
+                problems.append(f"{where}.date: expected MM/DD, got {sd['date']!r}")
+    return problems
+
+
+def compile_config(raw, source="config"):
+    """Validate a parsed config and return it with dates pre-parsed.
+
+    The result is still a plain dict with the same keys, so config.get()
+    callers are unaffected. Raises ConfigError listing every problem.
+    """
+    problems = validate(raw)
+    if problems:
+        raise ConfigError(source, problems)
+    config = dict(raw)
+    config["people"] = [
+        dict(person, date_of_birth=_parse_dob(person["date_of_birth"]))
+        for person in raw["people"]
+    ]
+    config["special_dates"] = [
+        dict(sd, month_day=_parse_month_day(sd["date"]))
+        for sd in raw.get("special_dates") or []
+    ]
+    for key in ("pets", "recurring"):
+        config[key] = raw.get(key) or []
+    return config
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def _cache_path(cache_dir, path):
+    name = hashlib.sha256(str(Path(path).resolve()).encode()).hexdigest()[:24]
+    return Path(cache_dir) / f"{name}.pickle"
+
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(cached, dict) or cached.get("schema") != SCHEMA_HASH:
+        return None
+    return cached
+
+
+def _write_cache(cache_file, entry):
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(cache_file.parent), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        log.warning("Could not cache compiled config: %s", e)
+
+
+def _recheck(config, path):
+    problems = _environment_problems(config)
+    if problems:
+        raise ConfigError(str(path), problems)
+    return config
+
+
+def load(path, cache_dir=None):
+    """Load, validate and compile the YAML config at `path`.
+
+    With `cache_dir`, reuses the compiled form while the file is unchanged.
+    """
+    path = Path(path)
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    cache_file = _cache_path(cache_dir, path) if cache_dir else None
+    cached = _read_cache(cache_file) if cache_file else None
+    if cached and cached["stamp"] == stamp:
+        return _recheck(cached["config"], path)
+
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached and cached["sha256"] == digest:
+        config = _recheck(cached["config"], path)
+    else:
+        config = compile_config(yaml.safe_load(data), source=str(path))
+    if cache_file:
+        _write_cache(cache_file, {"schema": SCHEMA_HASH, "stamp": stamp,
+                                  "sha256": digest, "config": config})
+    return config
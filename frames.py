@@ -0,0 +1,351 @@
+"""
+Server-side dashboard frames for e-ink and low-power displays
+
+A Pi Zero or an e-ink panel can't run a browser, but it can show a picture.
+After each generation, generate.py draws the dashboard payload as one PNG
+per configured frame spec, e.g. "800x480" (full colour), "800x480-gray4"
+(four dithered grays) or "800x480-1bit" (dithered black and white). app.py
+serves them with ETags so a display only downloads a frame when it changed.
+
+Next to each PNG is a small JSON file with the frame's ETag, the ETag of
+the frame it replaced, and the bounding box of the pixels that differ
+between the two. An e-ink client still showing that previous frame can
+refresh just that rectangle instead of flashing the whole panel.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageOps
+except ImportError:
+    Image = None
+
+log = logging.getLogger(__name__)
+
+MODES = ("color", "gray", "gray4", "1bit")
+SPEC_RE = re.compile(r"^(\d{2,4})x(\d{2,4})(?:-(%s))?$" % "|".join(MODES))
+
+# The layout is drawn for this size and scaled to the frame's height.
+BASE_WIDTH, BASE_HEIGHT = 800, 480
+
+FONT_REGULAR = "DejaVuSans.ttf"
+FONT_BOLD = "DejaVuSans-Bold.ttf"
+
+# Same palette as templates/index.html.
+BG = (255, 250, 245)
+SURFACE = (255, 255, 255)
+BORDER = (240, 230, 218)
+TEXT = (45, 35, 25)
+TEXT_MID = (92, 74, 58)
+ACCENT = (232, 93, 36)
+BLACK = (0, 0, 0)
+PILLS = [((253, 239, 233), (196, 77, 26)), ((242, 239, 249), (107, 79, 168)),
+         ((236, 243, 254), (37, 99, 235)), ((232, 246, 237), (21, 128, 61)),
+         ((251, 233, 241), (190, 24, 93))]
+
+# Emoji and variation selectors: no font a Pi ships with can draw them, and
+# a row of empty boxes looks worse than nothing.
+_UNDRAWABLE = re.compile("[\U00010000-\U0010ffff☀-➿️‍]")
+
+
+def parse_spec(spec):
+    """'800x480-1bit' as (800, 480, '1bit'); the mode defaults to colour."""
+    match = SPEC_RE.match(str(spec))
+    if not match:
+        raise ValueError(f"not a frame spec: {spec!r}")
+    return int(match.group(1)), int(match.group(2)), match.group(3) or "color"
+
+
+def _safe_name(family_id):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", family_id) or "_"
+
+
+def frame_path(frame_dir, family_id, spec):
+    return Path(frame_dir) / _safe_name(family_id) / f"{spec}.png"
+
+
+def frame_etag(png):
+    return hashlib.sha256(png).hexdigest()[:32]
+
+
+def read_meta(frame_dir, family_id, spec):
+    """The JSON written next to a frame, or None if there is no frame."""
+    try:
+        with open(frame_path(frame_dir, family_id, spec).with_suffix(".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Drawing
+# ---------------------------------------------------------------------------
+
+class _Fonts:
+    """TrueType fonts by (size, bold), falling back to Pillow's own."""
+
+    def __init__(self, path=None, bold_path=None):
+        self.paths = {False: path or FONT_REGULAR, True: bold_path or path or FONT_BOLD}
+        self.cache = {}
+
+    def __call__(self, size, bold=False):
+        key = (size, bold)
+        if key not in self.cache:
+            try:
+                font = ImageFont.truetype(self.paths[bold], size)
+            except OSError:
+                font = ImageFont.load_default(size)
+            self.cache[key] = font
+        return self.cache[key]
+
+
+def _clean(text):
+    return " ".join(_UNDRAWABLE.sub("", str(text or "")).split())
+
+
+def _wrap(draw, text, font, width):
+    """Split `text` into lines no wider than `width` pixels."""
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and draw.textlength(candidate, font=font) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _avatar(static_dir, image, size):
+    """A round avatar from static/, or None if there isn't one to draw."""
+    if not image or not static_dir:
+        return None
+    try:
+        with Image.open(Path(static_dir) / image) as im:
+            im = ImageOps.fit(im.convert("RGB"), (size, size))
+    except (OSError, ValueError):
+        return None
+    mask = Image.new("L", (size * 4, size * 4), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size * 4 - 1, size * 4 - 1), fill=255)
+    return im, mask.resize((size, size), Image.LANCZOS)
+
+
+def draw_dashboard(data, width, height, fonts=None, static_dir=None, mono=False):
+    """Draw a dashboard payload as an RGB image, laid out like index.html.
+
+    `mono` drops the tinted fills, which only turn into dither noise on a
+    black and white panel. Sections that don't fit are left off the bottom.
+    """
+    fonts = fonts or _Fonts()
+    s = height / BASE_HEIGHT
+    pad = round(16 * s)
+    gap = round(10 * s)
+    right = width - pad
+    im = Image.new("RGB", (width, height), SURFACE if mono else BG)
+    draw = ImageDraw.Draw(im)
+    ai = data.get("ai_content") or {}
+    text, text_mid = (BLACK, BLACK) if mono else (TEXT, TEXT_MID)
+
+    # Header: brand and date, with a rule underneath.
+    brand, small = fonts(round(22 * s), bold=True), fonts(round(16 * s))
+    y = pad
+    draw.text((pad, y), "DinkyDash", font=brand, fill=text if mono else ACCENT)
+    today = _clean(data.get("today_display", ""))
+    draw.text((right, y + round(4 * s)), today, font=small, fill=text_mid, anchor="ra")
+    y += round(32 * s)
+    draw.line((pad, y, right, y), fill=text if mono else BORDER, width=max(1, round(s)))
+    y += gap
+
+    headline = _clean(ai.get("headline"))
+    if headline:
+        font = fonts(round(24 * s), bold=True)
+        for line in _wrap(draw, headline, font, right - pad)[:2]:
+            draw.text((pad, y), line, font=font, fill=text)
+            y += round(30 * s)
+        y += gap
+
+    # Chores as rounded pills, wrapping onto more rows when needed.
+    font = fonts(round(15 * s), bold=True)
+    pill_h = round(30 * s)
+    avatar_size = pill_h - round(6 * s)
+    x = pad
+    for i, chore in enumerate(data.get("chores") or []):
+        label = _clean(f"{chore.get('title', '')} — {chore.get('assigned_to', '')}")
+        avatar = _avatar(static_dir, chore.get("image"), avatar_size)
+        inner = draw.textlength(label, font=font) + (avatar_size + gap // 2 if avatar else 0)
+        w = round(inner + 2 * gap)
+        if x > pad and x + w > right:
+            x, y = pad, y + pill_h + gap // 2
+        fill, ink = PILLS[i % len(PILLS)]
+        if mono:
+            draw.rounded_rectangle((x, y, x + w, y + pill_h), radius=pill_h // 2,
+                                   outline=text, width=max(1, round(s)))
+            ink = text
+        else:
+            draw.rounded_rectangle((x, y, x + w, y + pill_h), radius=pill_h // 2, fill=fill)
+        tx = x + gap
+        if avatar:
+            im.paste(avatar[0], (tx, y + (pill_h - avatar_size) // 2), avatar[1])
+            tx += avatar_size + gap // 2
+        draw.text((tx, y + pill_h // 2), label, font=font, fill=ink, anchor="lm")
+        x += w + gap // 2
+    if data.get("chores"):
+        y += pill_h + gap
+
+    # Countdowns in two columns, soonest first (the payload is sorted).
+    regular, bold = fonts(round(15 * s)), fonts(round(15 * s), bold=True)
+    column = (right - pad) // 2
+    row_h = round(22 * s)
+    countdowns = (data.get("countdowns") or [])[:6]
+    for i, cd in enumerate(countdowns):
+        cx = pad + (i % 2) * column
+        cy = y + (i // 2) * row_h
+        days = cd.get("days")
+        if days == 0:
+            lead, rest = "Today:", f" {cd.get('title', '')}!"
+        else:
+            lead, rest = ("1 day" if days == 1 else f"{days} days"), f" until {cd.get('title', '')}"
+        draw.text((cx, cy), lead, font=bold, fill=ACCENT if days == 0 and not mono else text)
+        draw.text((cx + draw.textlength(lead + " ", font=bold), cy), _clean(rest),
+                  font=regular, fill=text_mid)
+    if countdowns:
+        y += ((len(countdowns) + 1) // 2) * row_h + gap
+
+    for event in (ai.get("events") or [])[:2]:
+        title, note = _clean(event.get("title")), _clean(event.get("commentary"))
+        draw.text((pad, y), f"▸ {title}", font=bold, fill=text)
+        tx = pad + draw.textlength(f"▸ {title}", font=bold)
+        note_lines = _wrap(draw, f"— {note}", regular, right - tx - gap // 2)
+        if note_lines:
+            draw.text((tx + gap // 2, y), note_lines[0], font=regular, fill=text_mid)
+        y += row_h
+    if ai.get("events"):
+        y += gap // 2
+
+    # Info boxes side by side, filling whatever height is left.
+    boxes = [(label, _clean(ai.get(key))) for label, key in
+             (("Fun fact:", "fun_fact"), ("Challenge:", "daily_challenge"),
+              ("Pet corner:", "pet_corner")) if ai.get(key)]
+    if boxes and y < height - pad - row_h:
+        font = fonts(round(14 * s))
+        box_w = (right - pad - gap * (len(boxes) - 1)) // len(boxes)
+        line_h = round(18 * s)
+        for i, (label, body) in enumerate(boxes):
+            bx = pad + i * (box_w + gap)
+            draw.rounded_rectangle((bx, y, bx + box_w, height - pad), radius=round(8 * s),
+                                   fill=SURFACE, outline=text if mono else BORDER,
+                                   width=max(1, round(s)))
+            draw.text((bx + gap, y + gap), label, font=fonts(font.size, bold=True),
+                      fill=text)
+            max_lines = max(0, (height - pad - y - 2 * gap) // line_h - 1)
+            for n, line in enumerate(_wrap(draw, body, font, box_w - 2 * gap)[:max_lines]):
+                draw.text((bx + gap, y + gap + (n + 1) * line_h), line, font=font,
+                          fill=text_mid)
+    return im
+
+
+def to_mode(im, mode):
+    """Reduce an RGB frame for the panel: 8-bit gray, four dithered grays or
+    dithered 1-bit."""
+    if mode == "gray":
+        return im.convert("L")
+    if mode == "gray4":
+        palette = Image.new("P", (1, 1))
+        palette.putpalette([v for level in (0, 85, 170, 255) for v in (level,) * 3])
+        return im.convert("L").convert("RGB").quantize(
+            palette=palette, dither=Image.Dither.FLOYDSTEINBERG).convert("L")
+    if mode == "1bit":
+        return im.convert("L").convert("1", dither=Image.Dither.FLOYDSTEINBERG)
+    return im
+
+
+def diff_box(previous, current):
+    """Bounding box (left, top, right, bottom) of the pixels that changed,
+    None if nothing did, or the whole frame if the two can't be compared."""
+    if previous is None or previous.size != current.size or previous.mode != current.mode:
+        return [0, 0, *current.size]
+    box = ImageChops.difference(previous.convert("L") if current.mode == "1" else previous,
+                                current.convert("L") if current.mode == "1" else current
+                                ).getbbox()
+    return list(box) if box else None
+
+
+# ---------------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------------
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def _png_bytes(frame):
+    out = io.BytesIO()
+    frame.save(out, format="PNG")
+    return out.getvalue()
+
+
+def render_frames(data, specs, frame_dir, family_id, static_dir=None, font=None):
+    """Write a PNG and its metadata for each frame spec; returns the metadata.
+
+    Each spec is drawn once in colour per size and reduced from there, so an
+    800x480 colour frame and its 1-bit twin share the layout work.
+    """
+    if Image is None:
+        log.warning("Pillow is not installed, skipping dashboard frames")
+        return []
+    fonts = _Fonts(font)
+    drawn = {}
+    written = []
+    for spec in specs:
+        width, height, mode = parse_spec(spec)
+        mono = mode in ("1bit", "gray4")
+        key = (width, height, mono)
+        if key not in drawn:
+            drawn[key] = draw_dashboard(data, width, height, fonts, static_dir, mono)
+        frame = to_mode(drawn[key], mode)
+
+        path = frame_path(frame_dir, family_id, spec)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        previous_meta = read_meta(frame_dir, family_id, spec)
+        try:
+            with Image.open(path) as old:
+                previous = old.copy()
+        except (OSError, ValueError):
+            previous = None
+
+        buf = _png_bytes(frame)
+        etag = frame_etag(buf)
+        if previous_meta and previous_meta.get("etag") == etag:
+            written.append(previous_meta)
+            continue
+        meta = {
+            "spec": spec,
+            "width": width,
+            "height": height,
+            "mode": mode,
+            "etag": etag,
+            "generated_at": data.get("generated_at"),
+            "previous_etag": previous_meta.get("etag") if previous_meta and previous else None,
+            "diff": diff_box(previous, frame),
+        }
+        _write_atomic(path, buf)
+        _write_atomic(path.with_suffix(".json"), json.dumps(meta).encode())
+        written.append(meta)
+        log.info("Frame %s written (changed area %s)", spec, meta["diff"])
+    return written
@@ -6,22 +6,42 @@ Runs once per day via cron. Fetches calendar events, builds a prompt,
 calls the Claude API, and saves structured JSON for the Flask app.
 """
 
+import argparse
 import calendar
+import hashlib
+import heapq
 import json
 import logging
 import os
+import queue
 import random
 import sys
 import tempfile
-from datetime import date, datetime, timedelta
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
+from time import monotonic, sleep
+from urllib.parse import urlsplit, urlunsplit
 
 import requests
-import yaml
 from dotenv import load_dotenv
 from icalendar import Calendar
 from recurring_ical_events import of as recurring_events_of
 
+import config_compiler
+import frames
+import ledger
+import payload
+import store
+import thumbnails
+from profiling import StageProfiler
+
 load_dotenv()
 
 logging.basicConfig(
@@ -33,11 +53,13 @@ log = logging.getLogger(__name__)
 
 SCRIPT_DIR = Path(__file__).parent
 
+DEFAULT_MODEL = "claude-sonnet-4-5-20250929"
+
 
 def load_config():
-    config_path = SCRIPT_DIR / "config.yaml"
-    with open(config_path) as f:
-        return yaml.safe_load(f)
+    """Load config.yaml, validated and with dates parsed (see config_compiler)."""
+    return config_compiler.load(SCRIPT_DIR / "config.yaml",
+                                cache_dir=SCRIPT_DIR / ".config_cache")
 
 
 # ---------------------------------------------------------------------------
@@ -58,68 +80,370 @@ def _get_attendee_emails(event):
     return emails
 
 
-def fetch_calendar_events(url, days_ahead=14, filter_emails=None):
-    """Fetch and parse a public Google Calendar iCal URL.
-    Returns a list of event dicts for the next `days_ahead` days.
-    If filter_emails is set, only include events where all those
-    emails appear as attendees.
+# One occurrence of a calendar event. `start` is always timezone-aware (all-day
+# events start at local midnight) so occurrences from different feeds order
+# correctly; it is only turned into text by format_event_date(), for the prompt.
+# `attendees` holds lowercased attendee emails, for calendar_filter_emails.
+CalendarEvent = namedtuple(
+    "CalendarEvent", "start all_day summary location description attendees",
+    defaults=(frozenset(),),
+)
+
+
+def _local_midnight(day):
+    """Local midnight at the start of `day`, with that day's UTC offset."""
+    return datetime.combine(day, time.min).astimezone()
+
+
+def _aware_start(value):
+    """Normalise an iCal DTSTART value to a timezone-aware datetime.
+
+    Floating times (no TZID) and dates mean "wall clock wherever you are", so
+    each is localized with the offset in force on its own date; a fixed
+    offset taken today would be an hour out across a DST change.
     """
-    if not url:
-        log.warning("No calendar URL configured, skipping calendar fetch")
-        return []
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.astimezone()
+    return _local_midnight(value)
 
-    try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-    except Exception as e:
-        log.warning("Failed to fetch calendar: %s", e)
-        return []
 
+def format_event_date(event):
+    """Human-readable start of an event, in local time."""
+    if event.all_day:
+        return event.start.strftime("%A, %B %d")
+    return event.start.astimezone().strftime("%A, %B %d at %I:%M %p")
+
+
+def parse_feed(text):
+    """Parse iCal text into a Calendar, or None if it isn't valid iCal."""
     try:
-        cal = Calendar.from_ical(resp.text)
+        return Calendar.from_ical(text)
     except Exception as e:
         log.warning("Failed to parse iCal data: %s", e)
-        return []
+        return None
 
-    required_emails = {e.lower() for e in filter_emails} if filter_emails else set()
 
-    today = date.today()
-    end = today + timedelta(days=days_ahead)
-
-    events = []
-    skipped = 0
-    for event in recurring_events_of(cal).between(today, end):
-        # Filter by attendees if configured
-        if required_emails:
-            attendee_emails = _get_attendee_emails(event)
-            if not required_emails.issubset(attendee_emails):
-                skipped += 1
-                continue
-
-        summary = str(event.get("SUMMARY", "Untitled"))
-        dtstart = event.get("DTSTART")
-        if dtstart:
-            dtstart = dtstart.dt
-            if isinstance(dtstart, datetime):
-                date_str = dtstart.strftime("%A, %B %d at %I:%M %p")
-            else:
-                date_str = dtstart.strftime("%A, %B %d")
+def feed_occurrences(cal, start, end):
+    """Yield a feed's CalendarEvents from `start` until `end`, in start order.
+
+    Lazy, so a merge that stops early never expands the rest of the feed.
+    Every occurrence gets an event record, attendees included, because one
+    expansion is shared by families with different attendee filters (see
+    SharedOccurrences); filter_attendees() applies each family's on top.
+    """
+    for component in recurring_events_of(cal).after(start):
+        dtstart = component.get("DTSTART")
+        if dtstart is None:
+            continue
+        event_start = _aware_start(dtstart.dt)
+        if event_start >= end:
+            return
+        yield CalendarEvent(
+            start=event_start,
+            all_day=not isinstance(dtstart.dt, datetime),
+            summary=str(component.get("SUMMARY", "Untitled")),
+            location=str(component.get("LOCATION", "")) or None,
+            description=str(component.get("DESCRIPTION", "")) or None,
+            attendees=frozenset(_get_attendee_emails(component)),
+        )
+
+
+def merge_feeds(streams, max_events=None):
+    """Merge already-sorted occurrence streams into one list, in start order.
+
+    A heap-based k-way merge: O(n log k) for k feeds, and it stops pulling
+    from every stream as soon as `max_events` have been taken.
+    """
+    merged = heapq.merge(*streams, key=attrgetter("start"))
+    return list(islice(merged, max_events))
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_feed_url(url):
+    """The URL to fetch a feed from, spelled one way for every family.
+
+    webcal:// is just https:// to a calendar app, host names are case
+    insensitive and a default port changes nothing, so all of these are the
+    same feed; the fragment never reaches the server. A URL that can't be
+    taken apart (a bad port, say) is returned as given, to fail when it is
+    fetched like any other broken feed.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    try:
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme == "webcal":
+        scheme = "https"
+    netloc = (parts.hostname or "").lower()
+    if ":" in netloc:
+        netloc = f"[{netloc}]"  # IPv6
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; later callers share it.
+
+    `start()` begins a call and returns an object whose `future` finishes
+    with it. A key is forgotten as soon as that future is done, so this only
+    merges requests that overlap — it is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def join(self, key, start):
+        with self._lock:
+            call = self._calls.get(key)
+            # A finished call may not have been forgotten yet; don't reuse it.
+            if call is not None and not call.future.done():
+                return call
+            call = self._calls[key] = start()
+        call.future.add_done_callback(partial(self._forget, key, call))
+        return call
+
+    def _forget(self, key, call, future):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+
+# At most this many feed downloads run at once. They run on daemon threads,
+# so one that hangs past the deadline can't keep the process alive after
+# generation is done (a pool's workers are joined at exit).
+FEED_FETCH_WORKERS = 32
+_feed_slots = threading.BoundedSemaphore(FEED_FETCH_WORKERS)
+
+
+def _run_in_daemon(fn, *args):
+    """Call fn(*args) on a new daemon thread; return a Future for its result."""
+    future = Future()
+
+    def run():
+        with _feed_slots:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    threading.Thread(target=run, name="feed", daemon=True).start()
+    return future
+
+
+def _feed_cache_path(cache_dir, url):
+    return Path(cache_dir) / (hashlib.sha256(url.encode()).hexdigest()[:24] + ".ics")
+
+
+def _download_feed(url, timeout, cache_dir):
+    """Download one feed, keeping a copy as its last good version."""
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    text = resp.text
+    # Only a real calendar may replace the last good copy, not an HTML
+    # error page served with a 200.
+    if cache_dir and text.lstrip().startswith("BEGIN:VCALENDAR"):
+        path = _feed_cache_path(cache_dir, url)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A unique temp file: families sharing a feed may save it at once.
+            fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(text.encode("utf-8"))
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("Could not cache calendar feed: %s", e)
+    return text
+
+
+def _last_good_feed(url, cache_dir, raw_url=None):
+    """The last good copy of a feed, by its normalized URL or else by the URL
+    as configured, which is what copies saved before normalization used."""
+    if not cache_dir:
+        return None
+    for key in dict.fromkeys(filter(None, (url, raw_url))):
+        try:
+            return _feed_cache_path(cache_dir, key).read_bytes().decode("utf-8")
+        except OSError:
+            continue
+    return None
+
+
+class SharedOccurrences:
+    """One feed's occurrences, expanded lazily for any number of readers.
+
+    Each reader iterates from the start. Occurrences are expanded on demand
+    by whichever reader first gets that far, on its own thread, and kept
+    for the others, so the feed is expanded once and only as far as the
+    furthest reader's merge actually pulled.
+    """
+
+    def __init__(self, occurrences):
+        self._source = occurrences
+        self._seen = []
+        self._done = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._lock:
+                if i == len(self._seen):
+                    if self._done:
+                        return
+                    try:
+                        self._seen.append(next(self._source))
+                    except StopIteration:
+                        self._done = True
+                        return
+                event = self._seen[i]
+            i += 1
+            yield event
+
+
+def _expand_feed(text, start, end):
+    """A feed's occurrences between `start` and `end` as SharedOccurrences,
+    or None if its text isn't valid iCal."""
+    cal = parse_feed(text)
+    return None if cal is None else SharedOccurrences(feed_occurrences(cal, start, end))
+
+
+_UNREAD = object()
+
+
+class FeedFetch:
+    """One feed's download and what is made of it, shared by every family
+    that asks for the feed while it is in flight.
+
+    Only the download runs on a feed thread. Its text is parsed by the
+    first family to need each window, on that family's own thread (so a
+    profile of its generation shows the parsing, not a wait), and the
+    lazily expanded result is kept for the rest. So is the last good copy read when the
+    download fails or runs late: one read and parse however many families
+    fall back to it.
+    """
+
+    def __init__(self, url, raw_url, timeout, cache_dir):
+        self.url = url
+        self.raw_url = raw_url
+        self.cache_dir = cache_dir
+        self.future = _run_in_daemon(_download_feed, url, timeout, cache_dir)
+        self._lock = threading.Lock()
+        self._fallback = _UNREAD
+        self._events = {}
+
+    def _last_good(self):
+        """Called with the lock held."""
+        if self._fallback is _UNREAD:
+            self._fallback = _last_good_feed(self.url, self.cache_dir, self.raw_url)
+            if self._fallback is not None:
+                log.warning("Using last good copy of that calendar instead")
+        return self._fallback
+
+    def events(self, start, end):
+        """SharedOccurrences between `start` and `end` from the download if it
+        has succeeded by now, else from the last good copy; None if neither."""
+        if self.future.done() and self.future.exception() is None:
+            source, reason = "feed", None
         else:
-            date_str = "Unknown date"
+            source = "last good"
+            reason = self.future.exception() if self.future.done() else "timed out"
+        key = (source, start, end)
+        with self._lock:
+            if key not in self._events:
+                if reason is not None:
+                    log.warning("Failed to fetch calendar: %s", reason)
+                text = self.future.result() if source == "feed" else self._last_good()
+                self._events[key] = None if text is None else _expand_feed(text, start, end)
+            return self._events[key]
+
+
+# Shared by every generation in the process, so families subscribed to the
+# same feed (school district, sports league, public holidays) wait on one
+# download instead of each doing their own.
+_feed_flights = SingleFlight()
+
+
+def fetch_feed_events(urls, start, end, timeout=30, cache_dir=None):
+    """SharedOccurrences of each feed, fetched concurrently within
+    `timeout` seconds in total. Returns a list in `urls` order, with None
+    for a feed that couldn't be had at all.
+
+    Concurrent callers asking for the same feed share one download and its
+    expansions (see FeedFetch), so upstream requests and parsing scale with
+    unique feeds rather than with families. A feed that fails or is still
+    downloading when time is up is replaced by its last good copy from
+    `cache_dir`, or skipped if there is none — one hung feed never holds up
+    the dashboard. The download itself carries on for anyone else waiting
+    on it.
+    """
+    fetches = [
+        _feed_flights.join(url, partial(FeedFetch, url, raw_url, timeout, cache_dir))
+        for raw_url, url in ((raw_url, normalize_feed_url(raw_url)) for raw_url in urls)
+    ]
+    wait([fetch.future for fetch in fetches], timeout=timeout)
+    return [fetch.events(start, end) for fetch in fetches]
+
+
+def filter_attendees(events, required_emails, stats=None):
+    """Yield the events every one of `required_emails` attends; `stats["skipped"]`
+    counts the rest."""
+    for event in events:
+        if required_emails.issubset(event.attendees):
+            yield event
+        elif stats is not None:
+            stats["skipped"] = stats.get("skipped", 0) + 1
+
+
+def fetch_calendar_events(urls, days_ahead=14, filter_emails=None,
+                          max_events=None, today=None, timeout=30,
+                          cache_dir=None):
+    """Fetch and parse public iCal feeds (one URL or a list of them).
+    Returns CalendarEvents for the next `days_ahead` days, in start order
+    across all feeds, at most `max_events` of them.
+    If filter_emails is set, only include events where all those
+    emails appear as attendees.
+    Feeds are fetched concurrently within `timeout` seconds in total; see
+    fetch_feed_events() for what happens to late ones and how families
+    share them.
+    """
+    if isinstance(urls, str):
+        urls = [urls]
+    urls = [url for url in urls or [] if url]
+    if not urls:
+        log.warning("No calendar URL configured, skipping calendar fetch")
+        return []
 
-        location = str(event.get("LOCATION", "")) or None
-        description = str(event.get("DESCRIPTION", "")) or None
+    required_emails = frozenset(e.lower() for e in filter_emails or ())
 
-        events.append({
-            "summary": summary,
-            "date": date_str,
-            "location": location,
-            "description": description,
-        })
+    today = today or date.today()
+    start = _local_midnight(today)
+    end = _local_midnight(today + timedelta(days=days_ahead))
+
+    # Feeds are expanded unfiltered so they can be shared; this family's
+    # filter is applied on top, lazily, as the merge pulls.
+    stats = {}
+    streams = [
+        filter_attendees(events, required_emails, stats)
+        for events in fetch_feed_events(urls, start, end, timeout, cache_dir)
+        if events is not None
+    ]
 
-    events.sort(key=lambda e: e["date"])
-    log.info("Fetched %d calendar events for next %d days (%d filtered out)",
-             len(events), days_ahead, skipped)
+    events = merge_feeds(streams, max_events)
+    log.info("Fetched %d calendar events for next %d days from %d feed(s) "
+             "(%d filtered out)", len(events), days_ahead, len(streams),
+             stats.get("skipped", 0))
     return events
 
 
@@ -153,9 +477,15 @@ def compute_age(dob, today=None):
 
 
 def compute_birthday_info(person, today=None):
-    """Return dict with birthday countdown info for a person."""
+    """Return dict with birthday countdown info for a person.
+
+    `date_of_birth` may be a date (as compiled configs have it) or a
+    YYYY-MM-DD string.
+    """
     today = today or date.today()
-    dob = datetime.strptime(person["date_of_birth"], "%Y-%m-%d").date()
+    dob = person["date_of_birth"]
+    if isinstance(dob, str):
+        dob = datetime.strptime(dob, "%Y-%m-%d").date()
     current_age = compute_age(dob, today)
 
     birthday_this_year = anniversary(today.year, dob.month, dob.day)
@@ -181,9 +511,12 @@ def compute_birthday_info(person, today=None):
 
 
 def compute_special_date_info(sd, today=None):
-    """Return dict with countdown info for a special date."""
+    """Return dict with countdown info for a special date.
+
+    Uses the compiled (month, day) pair when present, else parses "MM/DD".
+    """
     today = today or date.today()
-    month, day = [int(part) for part in sd["date"].split("/")]
+    month, day = sd.get("month_day") or [int(part) for part in sd["date"].split("/")]
     target = anniversary(today.year, month, day)
     if target < today:
         # Recompute from month/day rather than bumping the year: a Feb 28 that
@@ -345,8 +678,8 @@ def build_user_prompt(config, calendar_events, chore_assignments,
         lines.append("")
         lines.append("UPCOMING CALENDAR EVENTS (next 14 days):")
         for ev in calendar_events:
-            loc = f" at {ev['location']}" if ev.get("location") else ""
-            lines.append(f"- {ev['summary']} on {ev['date']}{loc}")
+            loc = f" at {ev.location}" if ev.location else ""
+            lines.append(f"- {ev.summary} on {format_event_date(ev)}{loc}")
 
     if special_date_infos:
         lines.append("")
@@ -402,22 +735,153 @@ def build_user_prompt(config, calendar_events, chore_assignments,
 # Claude API call
 # ---------------------------------------------------------------------------
 
-def call_claude(system_prompt, user_prompt, config):
-    """Call the Claude API and return the response text."""
+ClaudeReply = namedtuple("ClaudeReply", "text usage model first_token_seconds")
+
+
+class Abandoned(Exception):
+    """A streamed reply given up on because another model answered first."""
+
+    def __init__(self, usage):
+        super().__init__("another model answered first")
+        self.usage = usage
+
+
+def call_claude(system_prompt, user_prompt, config, timeout=None, model=None,
+                on_first_token=None, abandon=None):
+    """Stream one reply from the Claude API and return a ClaudeReply.
+
+    `timeout` bounds the whole call in seconds. The SDK's own retries are
+    off; generate() retries, and knows how much time is left to do it in.
+    `on_first_token` is called when the first text arrives, and once the
+    `abandon` event is set the stream is dropped with Abandoned, which also
+    stops the tokens being generated (and billed).
+    """
     from anthropic import Anthropic
 
-    client = Anthropic()
-    model = config.get("claude_model", "claude-sonnet-4-5-20250929")
+    # None falls back to ANTHROPIC_BASE_URL, then the real API; set either
+    # to mock_anthropic.py's address to run offline.
+    client = Anthropic(max_retries=0, base_url=config.get("anthropic_base_url"))
+    model = model or config.get("claude_model", DEFAULT_MODEL)
     max_tokens = config.get("max_tokens", 2048)
 
     log.info("Calling Claude API (model=%s, max_tokens=%d)", model, max_tokens)
-    response = client.messages.create(
+    options = {} if timeout is None else {"timeout": timeout}
+    started = monotonic()
+    first_token_seconds = None
+    with client.messages.stream(
         model=model,
         max_tokens=max_tokens,
         system=system_prompt,
         messages=[{"role": "user", "content": user_prompt}],
-    )
-    return response.content[0].text
+        **options,
+    ) as stream:
+        for event in stream:
+            if abandon is not None and abandon.is_set():
+                raise Abandoned(stream.current_message_snapshot.usage)
+            if first_token_seconds is None and event.type == "content_block_delta":
+                first_token_seconds = monotonic() - started
+                if on_first_token is not None:
+                    on_first_token()
+        response = stream.get_final_message()
+    return ClaudeReply(response.content[0].text, response.usage, response.model,
+                       first_token_seconds)
+
+
+# Used until the ledger has enough first-token times to take a p95 from.
+DEFAULT_HEDGE_AFTER_SECONDS = 10
+# Never hedge sooner than this, however fast the primary usually is.
+MIN_HEDGE_AFTER_SECONDS = 2
+
+_hedge_cutoffs = {}
+
+
+def hedge_cutoff(config, ledger_path, model):
+    """Seconds to wait for `model`'s first token before hedging.
+
+    `claude_hedge_after_seconds` if configured, else the p95 time to first
+    token from the usage ledger, read once per process.
+    """
+    if config.get("claude_hedge_after_seconds"):
+        return config["claude_hedge_after_seconds"]
+    key = (str(ledger_path), model)
+    if key not in _hedge_cutoffs:
+        p95 = ledger.first_token_p95(ledger_path, model) if ledger_path else None
+        _hedge_cutoffs[key] = (DEFAULT_HEDGE_AFTER_SECONDS if p95 is None
+                               else max(MIN_HEDGE_AFTER_SECONDS, p95))
+    return _hedge_cutoffs[key]
+
+
+def hedged_call(system_prompt, user_prompt, config, deadline, hedge_after,
+                on_request=None):
+    """Ask the model chain for a dashboard; return (ClaudeReply, ai_content).
+
+    Starts with `claude_model`. If no model has begun streaming after
+    `hedge_after` seconds, the next of `claude_fallback_models` is raced
+    against it; a model that fails or replies with invalid JSON hands over
+    to the next at once. The first valid reply wins and the rest are
+    abandoned. `on_request(model, role, seconds, reply, usage, error)` is
+    called from each request's thread when it ends. Raises the last error
+    if every model fails, or TimeoutError at the deadline.
+    """
+    models = [config.get("claude_model", DEFAULT_MODEL)]
+    models += config.get("claude_fallback_models") or []
+    results = queue.Queue()
+    streaming = threading.Event()
+    abandon = threading.Event()
+
+    def request(model, role):
+        started = monotonic()
+        reply = usage = content = error = None
+        try:
+            reply = call_claude(system_prompt, user_prompt, config,
+                                timeout=deadline.remaining(), model=model,
+                                on_first_token=streaming.set, abandon=abandon)
+            usage = reply.usage
+            content = parse_ai_response(reply.text)
+        except Abandoned as e:
+            usage = e.usage
+            error = e
+        except Exception as e:
+            error = e
+        if on_request is not None:
+            on_request(model, role, monotonic() - started, reply, usage, error)
+        results.put((model, reply, content, error))
+
+    def launch(model, role):
+        threading.Thread(target=request, args=(model, role), daemon=True).start()
+
+    launch(models[0], "primary")
+    launched = running = 1
+    last_error = None
+    try:
+        while running:
+            can_hedge = launched < len(models) and not streaming.is_set()
+            try:
+                model, reply, content, error = results.get(
+                    timeout=min(hedge_after, deadline.remaining()) if can_hedge
+                    else deadline.remaining())
+            except queue.Empty:
+                if can_hedge and deadline.remaining() > 0:
+                    log.warning("No reply started after %.1fs, hedging with %s",
+                                hedge_after, models[launched])
+                    launch(models[launched], "hedge")
+                    launched += 1
+                    running += 1
+                    continue
+                raise TimeoutError("generation deadline reached")
+            running -= 1
+            if error is None:
+                return reply, content
+            log.warning("%s failed: %s", model, error)
+            last_error = error
+            if launched < len(models):
+                log.warning("Falling back to %s", models[launched])
+                launch(models[launched], "fallback")
+                launched += 1
+                running += 1
+        raise last_error
+    finally:
+        abandon.set()
 
 
 def parse_ai_response(text):
@@ -477,39 +941,162 @@ def record_content_history(path, entry, keep=30):
 # Main
 # ---------------------------------------------------------------------------
 
-def generate():
+# Below this, an API attempt is unlikely to finish before the deadline and
+# would only delay the fallback to yesterday's dashboard.
+MIN_API_ATTEMPT_SECONDS = 5
+
+
+def record_attempt(path, run_id, family_id, today, attempt, model, role,
+                   seconds, reply, usage, error, max_tokens=None):
+    """Append one API request to the usage ledger (see ledger.py)."""
+    tokens = ledger.usage_tokens(usage)
+    first_token = reply.first_token_seconds if reply is not None else None
+    estimate = {}
+    if isinstance(error, Abandoned):
+        status = "abandoned"
+        # Only the output seen before dropping the stream is known, but the
+        # API bills what it had generated by the time it noticed; bound it
+        # by a reply that ran all the way to max_tokens.
+        if max_tokens:
+            estimate = {
+                "estimated": True,
+                "cost_usd_max": ledger.cost_usd(model, dict(tokens, output_tokens=max(
+                    tokens["output_tokens"], max_tokens))),
+            }
+    else:
+        # A reply that wasn't valid JSON is an error but still cost tokens.
+        status = "ok" if error is None else "error"
+    ledger.record(path, {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "date": today.isoformat(),
+        "family_id": family_id,
+        "run_id": run_id,
+        "attempt": attempt,
+        "role": role,
+        "model": model,
+        "status": status,
+        "error": None if error is None else f"{type(error).__name__}: {error}",
+        "latency_ms": round(seconds * 1000),
+        "first_token_ms": None if first_token is None else round(first_token * 1000),
+        **tokens,
+        "cost_usd": ledger.cost_usd(model, tokens),
+        **estimate,
+    })
+
+
+class Deadline:
+    """End-to-end time budget for one generation run."""
+
+    def __init__(self, seconds):
+        self.expires_at = monotonic() + seconds
+
+    def remaining(self, cap=None):
+        """Seconds left, never negative, and at most `cap` if given."""
+        left = max(0.0, self.expires_at - monotonic())
+        return left if cap is None else min(left, cap)
+
+
+def compute_context(config, today):
+    """Return (birthday_infos, special_date_infos, chore_assignments)."""
+    birthday_infos = [compute_birthday_info(p, today) for p in config["people"]]
+    special_date_infos = [
+        compute_special_date_info(sd, today)
+        for sd in config.get("special_dates", [])
+    ]
+    chore_assignments = compute_chore_assignments(
+        config.get("recurring", []), config["people"], today
+    )
+    return birthday_infos, special_date_infos, chore_assignments
+
+
+def build_avatar_thumbnails(config):
+    """Map each person/pet image to a display-sized thumbnail in static/."""
+    size = config.get("avatar_size", 96)
+    images = {
+        entry.get("image")
+        for entry in config["people"] + config.get("pets", [])
+        if entry.get("image")
+    }
+    return {
+        image: thumbnails.thumbnail(SCRIPT_DIR / "static", image, size)
+        for image in images
+    }
+
+
+def open_store(config):
+    """Open the generations store if `database_file` is configured, else None."""
+    db_file = config.get("database_file")
+    if not db_file:
+        return None
+    return store.connect(SCRIPT_DIR / db_file)
+
+
+def run_stages(stages, profiler):
+    """Run independent {name: callable} stages; return {name: result}.
+
+    Side by side normally. Under --profile they run one after another on
+    this thread, so that each stage's profile holds its own work.
+    """
+    if profiler.enabled:
+        results = {}
+        for name, fn in stages.items():
+            with profiler.stage(name):
+                results[name] = fn()
+        return results
+    with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+        futures = {name: pool.submit(fn) for name, fn in stages.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def generate(config=None, profiler=None):
+    """Generate today's dashboard for `config` (default: config.yaml).
+
+    `profiler` is a profiling.StageProfiler to report each stage to.
+    """
     # Check for API key early with a clear error message
     if not os.environ.get("ANTHROPIC_API_KEY"):
         log.error("ANTHROPIC_API_KEY not found in environment.")
         log.error("Add it to your .env file: ANTHROPIC_API_KEY=sk-ant-...")
         sys.exit(1)
 
-    config = load_config()
+    try:
+        config = config or load_config()
+    except config_compiler.ConfigError as e:
+        log.error("config.yaml is invalid:")
+        for problem in e.problems:
+            log.error("  %s", problem)
+        sys.exit(1)
+    profiler = profiler or StageProfiler()
     today = date.today()
     now = datetime.now()
+    deadline = Deadline(config.get("generation_deadline_seconds", 300))
 
-    # Compute all context
-    birthday_infos = [compute_birthday_info(p) for p in config["people"]]
-    special_date_infos = [
-        compute_special_date_info(sd)
-        for sd in config.get("special_dates", [])
-    ]
-    chore_assignments = compute_chore_assignments(
-        config.get("recurring", []), config["people"]
-    )
-    calendar_events = fetch_calendar_events(
-        config.get("calendar_url", ""),
-        days_ahead=14,
-        filter_emails=config.get("calendar_filter_emails"),
-    )
-
-    # Load recent content so we can tell Claude what NOT to repeat, and pick a
-    # random theme/category to give today's content a fresh anchor.
+    # Calendar fetch, history load and the date arithmetic don't depend on
+    # each other, so run them side by side; the fetch dominates anyway.
     history_file = SCRIPT_DIR / config.get(
         "content_history_file", "content_history.json"
     )
     history_days = config.get("history_days", 30)
-    recent_content = load_content_history(history_file)[-history_days:]
+    inputs = run_stages({
+        "calendar": partial(
+            fetch_calendar_events,
+            config.get("calendar_urls") or config.get("calendar_url", ""),
+            days_ahead=14,
+            filter_emails=config.get("calendar_filter_emails"),
+            max_events=config.get("calendar_max_events", 50),
+            today=today,
+            timeout=deadline.remaining(config.get("calendar_timeout", 30)),
+            cache_dir=SCRIPT_DIR / config.get("calendar_cache_dir", ".calendar_cache"),
+        ),
+        "history": partial(load_content_history, history_file),
+        "context": partial(compute_context, config, today),
+    }, profiler)
+    birthday_infos, special_date_infos, chore_assignments = inputs["context"]
+    # Load recent content so we can tell Claude what NOT to repeat.
+    recent_content = inputs["history"][-history_days:]
+    calendar_events = inputs["calendar"]
+
+    # Pick a random theme/category to give today's content a fresh anchor.
     fun_fact_theme = random.choice(FUN_FACT_THEMES)
     challenge_category = random.choice(CHALLENGE_CATEGORIES)
     log.info(
@@ -518,35 +1105,67 @@ def generate():
     )
 
     # Build prompt
-    user_prompt = build_user_prompt(
-        config, calendar_events, chore_assignments,
-        birthday_infos, special_date_infos,
-        recent_content=recent_content,
-        fun_fact_theme=fun_fact_theme,
-        challenge_category=challenge_category,
-    )
+    with profiler.stage("prompt"):
+        user_prompt = build_user_prompt(
+            config, calendar_events, chore_assignments,
+            birthday_infos, special_date_infos,
+            recent_content=recent_content,
+            fun_fact_theme=fun_fact_theme,
+            challenge_category=challenge_category,
+        )
     log.info("Prompt built (%d characters)", len(user_prompt))
 
-    # Call Claude API with retries
+    # Call Claude API with retries, as long as the deadline leaves room
+    family_id = config.get("family_id", "default")
+    ledger_file = config.get("ledger_file", ledger.DEFAULT_FILE)
+    ledger_path = SCRIPT_DIR / ledger_file if ledger_file else None
+    hedge_after = hedge_cutoff(config, ledger_path,
+                               config.get("claude_model", DEFAULT_MODEL))
+    run_id = uuid.uuid4().hex
     ai_content = None
     last_error = None
-    for attempt in range(3):
-        try:
-            raw_response = call_claude(SYSTEM_PROMPT, user_prompt, config)
-            ai_content = parse_ai_response(raw_response)
-            break
-        except json.JSONDecodeError as e:
-            log.warning("Attempt %d: JSON parse error: %s", attempt + 1, e)
-            last_error = e
-        except Exception as e:
-            log.warning("Attempt %d: API error: %s", attempt + 1, e)
-            last_error = e
+    with profiler.stage("api"):
+        for attempt in range(3):
+            # Back off as the SDK would have, so a rate limit has a chance to
+            # clear before the next attempt.
+            backoff = 2 ** attempt if attempt else 0
+            if deadline.remaining() - backoff < MIN_API_ATTEMPT_SECONDS:
+                log.warning("Generation deadline reached, no time for attempt %d",
+                            attempt + 1)
+                last_error = last_error or TimeoutError("generation deadline reached")
+                break
+            sleep(backoff)
+            on_request = None
+            if ledger_path:
+                on_request = partial(record_attempt, ledger_path, run_id, family_id,
+                                     today, attempt,
+                                     max_tokens=config.get("max_tokens", 2048))
+            try:
+                _, ai_content = hedged_call(SYSTEM_PROMPT, user_prompt, config,
+                                            deadline, hedge_after, on_request)
+                break
+            except json.JSONDecodeError as e:
+                log.warning("Attempt %d: JSON parse error: %s", attempt + 1, e)
+                last_error = e
+            except Exception as e:
+                log.warning("Attempt %d: API error: %s", attempt + 1, e)
+                last_error = e
+
+    db = open_store(config)
 
     if ai_content is None:
         log.error("All attempts failed. Last error: %s", last_error)
         log.error("Preserving previous dashboard data.")
+        if db is not None:
+            store.record_failure(db, family_id, today, now, last_error)
         sys.exit(1)
 
+    # Point the payload at display-sized avatars rather than the uploads.
+    with profiler.stage("thumbnails"):
+        avatars = build_avatar_thumbnails(config)
+    for chore in chore_assignments:
+        chore["image"] = avatars.get(chore["image"], chore["image"])
+
     # Build the full dashboard envelope
     # Sort countdowns: birthdays + special dates together, by days remaining
     all_countdowns = []
@@ -555,7 +1174,7 @@ def generate():
             "emoji": "🎂",
             "title": f"{bday['name']}'s Birthday",
             "days": bday["days_until_birthday"],
-            "image": bday["image"],
+            "image": avatars.get(bday["image"], bday["image"]),
         })
     for sd in special_date_infos:
         all_countdowns.append({
@@ -566,48 +1185,82 @@ def generate():
         })
     all_countdowns.sort(key=lambda c: c["days"])
 
-    # Map person name → image for template lookup
-    people_images = {p["name"]: p.get("image", "") for p in config["people"]}
-
-    dashboard_data = {
+    # Only what the screens draw: the calendar reached them through Claude's
+    # event commentary, and full iCal descriptions can be pages of HTML.
+    dashboard_data = payload.project({
         "generated_at": now.isoformat(),
         "generated_date": today.isoformat(),
         "today_display": now.strftime("%A, %B %d"),
-        "people_images": people_images,
         "chores": chore_assignments,
         "countdowns": all_countdowns,
-        "calendar_events": calendar_events,
         "ai_content": ai_content,
-    }
+    })
+
+    with profiler.stage("save"):
+        # Write atomically
+        data_file = SCRIPT_DIR / config.get("data_file", "dashboard_data.json")
+        fd, tmp_path = tempfile.mkstemp(
+            dir=str(data_file.parent), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload.dumps(dashboard_data, data_file))
+            os.rename(tmp_path, str(data_file))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
 
-    # Write atomically
-    data_file = SCRIPT_DIR / config.get("data_file", "dashboard_data.json")
-    fd, tmp_path = tempfile.mkstemp(
-        dir=str(data_file.parent), suffix=".tmp"
+        log.info("Dashboard data written to %s", data_file)
+
+        if db is not None:
+            store.save_generation(db, family_id, today, now, dashboard_data)
+            log.info("Stored generation for family %r", family_id)
+
+        # Remember today's creative content so future runs don't repeat it.
+        record_content_history(
+            history_file,
+            {
+                "date": today.isoformat(),
+                "fun_fact": ai_content.get("fun_fact", ""),
+                "daily_challenge": ai_content.get("daily_challenge", ""),
+                "pet_corner": ai_content.get("pet_corner", ""),
+                "headline": ai_content.get("headline", ""),
+            },
+            keep=max(history_days, 30),
+        )
+
+    # Pictures of the dashboard for displays without a browser, only when
+    # asked for. A drawing problem must not cost the family the dashboard
+    # just saved.
+    frame_specs = config.get("frames")
+    if frame_specs:
+        with profiler.stage("frames"):
+            try:
+                frames.render_frames(
+                    dashboard_data, frame_specs,
+                    SCRIPT_DIR / config.get("frame_dir", "frames"), family_id,
+                    static_dir=SCRIPT_DIR / "static", font=config.get("frame_font"),
+                )
+            except Exception as e:
+                log.warning("Could not render dashboard frames: %s", e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate today's dashboard.")
+    parser.add_argument(
+        "--profile", nargs="?", metavar="DIR",
+        const=str(SCRIPT_DIR / "profiles" / datetime.now().strftime("%Y%m%d-%H%M%S")),
+        help="write per-stage cProfile and tracemalloc reports to DIR "
+             "(default: profiles/<timestamp>)",
     )
+    args = parser.parse_args()
+
+    profiler = StageProfiler(args.profile)
     try:
-        with os.fdopen(fd, "w") as f:
-            json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
-        os.rename(tmp_path, str(data_file))
-    except Exception:
-        os.unlink(tmp_path)
-        raise
-
-    log.info("Dashboard data written to %s", data_file)
-
-    # Remember today's creative content so future runs don't repeat it.
-    record_content_history(
-        history_file,
-        {
-            "date": today.isoformat(),
-            "fun_fact": ai_content.get("fun_fact", ""),
-            "daily_challenge": ai_content.get("daily_challenge", ""),
-            "pet_corner": ai_content.get("pet_corner", ""),
-            "headline": ai_content.get("headline", ""),
-        },
-        keep=max(history_days, 30),
-    )
+        generate(profiler=profiler)
+    finally:
+        profiler.write_summary()
 
 
 if __name__ == "__main__":
-    generate()
+    main()
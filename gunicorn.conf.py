@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for serving the dashboard in production.
+
+Used by run_app.sh. Every value can be overridden on the command line or
+with GUNICORN_CMD_ARGS, e.g. GUNICORN_CMD_ARGS="--workers 2".
+"""
+
+import os
+
+bind = os.environ.get("DINKYDASH_BIND", "0.0.0.0:5000")
+
+# One worker per core. Pages are rendered from an in-memory payload, so a
+# worker is CPU-bound; more processes than cores only costs RAM, which a Pi
+# has little of. Threads cover the odd slow client without another process.
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = 2
+worker_class = "gthread"
+
+# Import app.py once in the master; see wsgi.py.
+preload_app = True
+
+# A new payload needs no restart: each worker notices the replaced
+# dashboard_data.json (or a new commit to the store) on the next request and
+# swaps it in. Code changes need a restart, since the app is preloaded;
+# in-flight requests get graceful_timeout seconds to finish.
+graceful_timeout = 10
+keepalive = 5
+
+accesslog = None
+errorlog = "-"
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+DinkyDash API usage ledger
+
+generate.py appends one JSON line per Claude API request — successful,
+failed or abandoned for a faster hedge — with the model, token counts,
+latency, time to first token, which retry it was and what it cost. The p95
+time to first token also sets generate.py's hedging cutoff.
+The file is only ever appended to, so it doubles as an audit trail and can be
+rotated or shipped elsewhere with ordinary tools.
+
+An abandoned request only knows the output it streamed before being dropped,
+so its cost is a lower bound: it is marked "estimated" and carries
+"cost_usd_max", what it would have cost had it run all the way to max_tokens.
+
+Run this module to summarise it:
+
+    python ledger.py                                # everything
+    python ledger.py --since 2026-10-01 --until 2026-10-31
+    python ledger.py --file /var/lib/dinkydash/usage_ledger.jsonl
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_FILE = "usage_ledger.jsonl"
+
+# USD per million tokens: (input, output, cache write, cache read). Matched
+# by longest prefix so dated snapshots share their family's price. Keep in
+# step with https://www.anthropic.com/pricing.
+PRICES = {
+    "claude-opus-4-5": (5.00, 25.00, 6.25, 0.50),
+    "claude-opus-4": (15.00, 75.00, 18.75, 1.50),
+    "claude-sonnet-4": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-7-sonnet": (3.00, 15.00, 3.75, 0.30),
+    "claude-haiku-4-5": (1.00, 5.00, 1.25, 0.10),
+    "claude-3-5-haiku": (0.80, 4.00, 1.00, 0.08),
+}
+
+TOKEN_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+def price_for(model):
+    """Return the PRICES row for `model`, or None if it isn't listed."""
+    matches = [prefix for prefix in PRICES if model.startswith(prefix)]
+    return PRICES[max(matches, key=len)] if matches else None
+
+
+def cost_usd(model, tokens):
+    """Cost of one call from its token counts; None for an unpriced model."""
+    price = price_for(model)
+    if price is None:
+        return None
+    counts = [tokens.get(field) or 0 for field in TOKEN_FIELDS]
+    return sum(n * p for n, p in zip(counts, price)) / 1_000_000
+
+
+def usage_tokens(usage):
+    """Token counts from an SDK `response.usage` (None for a failed call)."""
+    return {field: getattr(usage, field, None) or 0 for field in TOKEN_FIELDS}
+
+
+def record(path, entry):
+    """Append `entry` as one line. Never raises: losing a ledger line must
+    not lose the dashboard."""
+    line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+    try:
+        # One write() on an O_APPEND descriptor, so concurrent runs for
+        # different families can't interleave within a line.
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        log.warning("Could not write usage ledger %s: %s", path, e)
+
+
+def read_entries(path, since=None, until=None):
+    """Yield ledger entries whose generation date is within [since, until]."""
+    since = since.isoformat() if since else ""
+    until = until.isoformat() if until else "9999"
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash or a full disk
+            if since <= entry.get("date", "") <= until:
+                yield entry
+
+
+def tail_entries(path, max_bytes=1 << 20):
+    """Yield the entries in roughly the last `max_bytes` of the ledger.
+
+    For recent statistics without reading a ledger that only ever grows.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            start = max(0, f.tell() - max_bytes)
+            f.seek(start)
+            if start:
+                f.readline()  # most likely a partial line
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return
+
+
+def _first_token_sample(entry):
+    """An entry's time to first token in ms, or None if it says nothing.
+
+    A stream abandoned before its first token still shows the first token
+    took at least that long; leaving those out would hide exactly the slow
+    calls hedging is for, so they count at their (lower bound) latency.
+    """
+    if entry.get("first_token_ms") is not None:
+        return entry["first_token_ms"] if entry.get("status") in ("ok", "abandoned") else None
+    return entry.get("latency_ms") if entry.get("status") == "abandoned" else None
+
+
+def first_token_p95(path, model, min_samples=20):
+    """p95 seconds to first token of recent answered or abandoned `model`
+    calls, or None while there are fewer than `min_samples` of them."""
+    samples = [_first_token_sample(entry) for entry in tail_entries(path)
+               if entry.get("model") == model]
+    samples = sorted(sample for sample in samples if sample is not None)
+    if len(samples) < min_samples:
+        return None
+    return percentile(samples, 95) / 1000
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarise(entries):
+    """Aggregate ledger entries into the numbers report() prints."""
+    latencies = defaultdict(list)
+    first_tokens = defaultdict(list)
+    spend = defaultdict(float)
+    runs = {}
+    unpriced = 0
+    requests = 0
+    estimated = 0
+    estimated_extra = 0.0
+    for entry in entries:
+        requests += 1
+        latencies[entry["model"]].append(entry["latency_ms"])
+        first_token = _first_token_sample(entry)
+        if first_token is not None:
+            first_tokens[entry["model"]].append(first_token)
+        if entry.get("cost_usd") is None:
+            unpriced += entry["status"] != "error"
+        else:
+            spend[entry["date"], entry["family_id"]] += entry["cost_usd"]
+        if entry.get("estimated"):
+            estimated += 1
+            if entry.get("cost_usd_max") is not None and entry.get("cost_usd") is not None:
+                estimated_extra += entry["cost_usd_max"] - entry["cost_usd"]
+        run = runs.setdefault(entry["run_id"], {"attempts": set(), "ok": False,
+                                                "hedged": False})
+        run["attempts"].add(entry.get("attempt", 0))
+        run["ok"] = run["ok"] or entry["status"] == "ok"
+        run["hedged"] = run["hedged"] or entry.get("role") == "hedge"
+
+    return {
+        "latency_ms": {
+            model: {
+                "calls": len(values),
+                "p50": percentile(sorted(values), 50),
+                "p95": percentile(sorted(values), 95),
+                "first_token_p50": percentile(sorted(first_tokens[model]), 50),
+                "first_token_p95": percentile(sorted(first_tokens[model]), 95),
+            }
+            for model, values in sorted(latencies.items())
+        },
+        "spend": dict(sorted(spend.items())),
+        "runs": len(runs),
+        "requests": requests,
+        "retried_runs": sum(len(run["attempts"]) > 1 for run in runs.values()),
+        "hedged_runs": sum(run["hedged"] for run in runs.values()),
+        "failed_runs": sum(not run["ok"] for run in runs.values()),
+        "unpriced_calls": unpriced,
+        "estimated_calls": estimated,
+        "estimated_extra_usd_max": estimated_extra,
+    }
+
+
+def report(summary):
+    """Format summarise() output as plain-text tables."""
+    lines = [f"{'model':<32}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}"
+             f"{'TTFT p50':>10}{'TTFT p95':>10}"]
+    for model, stats in summary["latency_ms"].items():
+        lines.append(f"{model:<32}{stats['calls']:>7}"
+                     f"{stats['p50']:>10.0f}{stats['p95']:>10.0f}"
+                     f"{stats['first_token_p50']:>10.0f}{stats['first_token_p95']:>10.0f}")
+
+    lines += ["", f"{'date':<12}{'family':<20}{'spend USD':>12}"]
+    total = 0.0
+    for (day, family), cost in summary["spend"].items():
+        lines.append(f"{day:<12}{family:<20}{cost:>12.4f}")
+        total += cost
+    lines.append(f"{'total':<32}{total:>12.4f}")
+
+    runs = summary["runs"]
+    lines += [
+        "",
+        f"runs: {runs}, API requests: {summary['requests']}",
+        f"retry rate: {summary['retried_runs'] / runs:.1%}" if runs else "retry rate: -",
+        f"hedge rate: {summary['hedged_runs'] / runs:.1%}" if runs else "hedge rate: -",
+        f"failure rate: {summary['failed_runs'] / runs:.1%}" if runs else "failure rate: -",
+    ]
+    if summary["unpriced_calls"]:
+        lines.append(f"{summary['unpriced_calls']} answered call(s) on models "
+                     "missing from PRICES are not in the spend")
+    if summary["estimated_calls"]:
+        lines.append(f"{summary['estimated_calls']} abandoned call(s) are counted at the "
+                     "tokens seen before dropping them; up to "
+                     f"{summary['estimated_extra_usd_max']:.4f} USD more if each ran "
+                     "to max_tokens")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file", default=str(SCRIPT_DIR / DEFAULT_FILE),
+                        help=f"ledger to read (default: {DEFAULT_FILE})")
+    parser.add_argument("--since", type=date.fromisoformat,
+                        help="first generation date, YYYY-MM-DD")
+    parser.add_argument("--until", type=date.fromisoformat,
+                        help="last generation date, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    try:
+        entries = list(read_entries(args.file, args.since, args.until))
+    except FileNotFoundError:
+        parser.exit(1, f"No ledger at {args.file}\n")
+    print(report(summarise(entries)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+DinkyDash local load test
+
+Starts the production server (gunicorn, see gunicorn.conf.py) against a
+synthetic dashboard, pinned to a few CPUs to approximate a Raspberry Pi, then
+hammers / and /preview and reports requests per second and latency.
+
+Usage:
+    python loadtest.py                      # 4 CPUs, like a Pi 4
+    python loadtest.py --cpus 1 --workers 1 # Pi Zero 2-ish
+    python loadtest.py --url http://raspberrypi:5000  # an already running server
+
+Pinning only limits how many cores the server may use, not how fast they are,
+so numbers from a desktop CPU are an upper bound for a Pi. Clients run in this
+process, on the CPUs the server was not pinned to where possible.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+from ledger import percentile
+
+SCRIPT_DIR = Path(__file__).parent
+
+SAMPLE_PAYLOAD = {
+    "generated_at": "2026-08-10T06:00:00",
+    "generated_date": "2026-08-10",
+    "today_display": "Monday, August 10",
+    "chores": [
+        {"emoji": "🍽", "title": "Set Table", "assigned_to": "Alice"},
+        {"emoji": "🐕", "title": "Feed Pet", "assigned_to": "Bob"},
+    ],
+    "countdowns": [
+        {"emoji": "🎂", "title": "Alice's Birthday", "days": 3},
+        {"emoji": "🎄", "title": "Christmas", "days": 137},
+    ],
+    "ai_content": {
+        "headline": "Three sleeps until Alice's birthday!",
+        "fun_fact": "Octopuses have three hearts and blue blood.",
+        "daily_challenge": "Draw a map of your street from memory.",
+        "pet_corner": "Buddy thinks the postman is a secret agent.",
+        "events": [
+            {"title": "Swimming", "commentary": "Bring goggles, not excuses."},
+        ],
+    },
+}
+
+
+def start_server(port, cpus, workers, data_file):
+    """Start gunicorn pinned to the first `cpus` CPUs; return the process."""
+    env = dict(os.environ, DINKYDASH_DATA_FILE=str(data_file),
+               DINKYDASH_BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(workers))
+    env.pop("DINKYDASH_DB", None)
+    available = sorted(os.sched_getaffinity(0))
+    server_cpus = set(available[:cpus])
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=SCRIPT_DIR, env=env,
+        preexec_fn=lambda: os.sched_setaffinity(0, server_cpus),
+    )
+    client_cpus = set(available[cpus:])
+    if client_cpus:
+        os.sched_setaffinity(0, client_cpus)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit("gunicorn exited during startup")
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("gunicorn did not come up within 30s")
+
+
+def run_load(host, port, path, concurrency, duration):
+    """Hit `path` from `concurrency` keep-alive clients for `duration` seconds.
+
+    Returns (latencies_ms, errors, elapsed_seconds).
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        mine = []
+        failed = 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+                continue
+            mine.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="load-test this server instead of starting one")
+    parser.add_argument("--cpus", type=int, default=4,
+                        help="CPUs to pin the server to (default: 4, a Pi 4)")
+    parser.add_argument("--workers", type=int,
+                        help="gunicorn workers (default: same as --cpus)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="simultaneous clients (default: 16)")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="seconds per path (default: 10)")
+    parser.add_argument("--port", type=int, default=5057)
+    parser.add_argument("--paths", nargs="+", default=["/", "/preview"])
+    args = parser.parse_args()
+
+    proc = None
+    tmp = None
+    if args.url:
+        parsed = urllib.parse.urlsplit(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        data_file = Path(tmp.name) / "dashboard_data.json"
+        data_file.write_text(json.dumps(SAMPLE_PAYLOAD, ensure_ascii=False))
+        host, port = "127.0.0.1", args.port
+        proc = start_server(port, args.cpus, args.workers or args.cpus, data_file)
+        print(f"Server pinned to {args.cpus} CPU(s), "
+              f"{args.workers or args.cpus} worker(s)")
+
+    try:
+        print(f"{'path':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for path in args.paths:
+            latencies, errors, elapsed = run_load(
+                host, port, path, args.concurrency, args.duration
+            )
+            latencies.sort()
+            print(f"{path:<12}{len(latencies) / elapsed:>10.1f}"
+                  f"{percentile(latencies, 50):>10.2f}"
+                  f"{percentile(latencies, 99):>10.2f}{errors:>8}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic API
+
+Serves enough of the Messages and Message Batches endpoints for generate.py
+to run end to end without network access or an API key, with latency, rate
+limiting and failures under our control. It also serves a small recurring
+calendar at /calendar.ics so the calendar fetch stays offline too.
+
+Usage:
+    python mock_anthropic.py                                 # port 8765
+    python mock_anthropic.py --latency lognormal:1500:0.5 --rate-limit-rate 0.05
+    python mock_anthropic.py --responses canned.json         # your own replies
+
+Streaming requests ("stream": true) are answered with server-sent events;
+for them the latency is the time to first token. Per-model latency lets a
+slow primary and a fast fallback model be simulated together:
+    python mock_anthropic.py --latency 20000 --model-latency claude-haiku=400
+
+then point generate.py at it with `anthropic_base_url: "http://127.0.0.1:8765"`
+in config.yaml (or ANTHROPIC_BASE_URL). Any API key is accepted.
+
+Latency specs, in milliseconds:
+    800                 always 800
+    uniform:200:1500    evenly between 200 and 1500
+    lognormal:800:0.5   median 800, sigma 0.5 — a long right tail, like the
+                        real API under load
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = {
+    "headline": "Happy testing day, everyone!",
+    "fun_fact": "Octopuses have three hearts and blue blood.",
+    "daily_challenge": "Everyone names an animal for each letter of their name.",
+    "pet_corner": "The cat has declared the sofa a nap-only zone.",
+    "events": [],
+}
+
+CALENDAR = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//dinkydash//mock//EN",
+    "BEGIN:VEVENT",
+    "UID:school-run@mock",
+    "SUMMARY:School run",
+    "DTSTART:20260105T080000Z",
+    "RRULE:FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "END:VEVENT",
+    "BEGIN:VEVENT",
+    "UID:swimming@mock",
+    "SUMMARY:Swimming lesson",
+    "LOCATION:Leisure centre",
+    "DTSTART:20260107T163000Z",
+    "RRULE:FREQ=WEEKLY;BYDAY=WE",
+    "END:VEVENT",
+    "END:VCALENDAR",
+    "",
+])
+
+_BATCH_PATH = re.compile(r"^/v1/messages/batches/([\w-]+)(/results)?$")
+
+
+def latency_sampler(spec, rng):
+    """Turn a latency spec (see the module docstring) into a function
+    returning a delay in seconds."""
+    kind, _, args = spec.partition(":")
+    try:
+        if not args:
+            fixed = float(kind) / 1000
+            return lambda: fixed
+        params = [float(a) for a in args.split(":")]
+        if kind == "uniform":
+            low, high = params
+            return lambda: rng.uniform(low, high) / 1000
+        if kind == "lognormal":
+            median, sigma = params
+            return lambda: rng.lognormvariate(math.log(median), sigma) / 1000
+    except ValueError:
+        pass
+    raise ValueError(f"Bad latency spec {spec!r}")
+
+
+class Settings:
+    """What the server does; shared by all handler threads."""
+
+    def __init__(self, latency="800", error_rate=0.0, rate_limit_rate=0.0,
+                 invalid_json_rate=0.0, responses=None, batch_seconds=5.0,
+                 seed=None, model_latency=None):
+        self.rng = random.Random(seed)
+        self.default_latency = latency_sampler(latency, self.rng)
+        # Model name prefix -> sampler, overriding the default.
+        self.model_latency = {
+            prefix: latency_sampler(spec, self.rng)
+            for prefix, spec in (model_latency or {}).items()
+        }
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.invalid_json_rate = invalid_json_rate
+        self.responses = responses or [DEFAULT_REPLY]
+        self.batch_seconds = batch_seconds
+        self.stats = Counter()
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def sample_latency(self, model=""):
+        matches = [prefix for prefix in self.model_latency if model.startswith(prefix)]
+        if matches:
+            return self.model_latency[max(matches, key=len)]()
+        return self.default_latency()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def outcome(self):
+        """Pick 'rate_limited', 'overloaded', 'invalid_json' or 'ok'."""
+        roll = self.rng.random()
+        for name, rate in (("rate_limited", self.rate_limit_rate),
+                           ("overloaded", self.error_rate),
+                           ("invalid_json", self.invalid_json_rate)):
+            if roll < rate:
+                return name
+            roll -= rate
+        return "ok"
+
+
+def message(settings, params, outcome="ok"):
+    """A Messages API response body for request `params`."""
+    prompt = json.dumps(params.get("system", "")) + json.dumps(params.get("messages", []))
+    if outcome == "invalid_json":
+        text = "Sorry, here is your dashboard: {headline: oops"
+    else:
+        text = json.dumps(settings.rng.choice(settings.responses), ensure_ascii=False)
+    return {
+        "id": "msg_mock_" + uuid.uuid4().hex[:24],
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "claude-mock"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            # Roughly 4 characters per token is close enough for sizing.
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    }
+
+
+def stream_events(msg, chunks=8):
+    """Split a message() body into the Messages streaming event sequence."""
+    text = msg["content"][0]["text"]
+    start = dict(msg, content=[], stop_reason=None,
+                 usage=dict(msg["usage"], output_tokens=1))
+    yield "message_start", {"type": "message_start", "message": start}
+    yield "content_block_start", {"type": "content_block_start", "index": 0,
+                                  "content_block": {"type": "text", "text": ""}}
+    step = max(1, math.ceil(len(text) / chunks))
+    for i in range(0, len(text), step):
+        yield "content_block_delta", {
+            "type": "content_block_delta", "index": 0,
+            "delta": {"type": "text_delta", "text": text[i:i + step]},
+        }
+    yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+    yield "message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": msg["usage"]["output_tokens"]},
+    }
+    yield "message_stop", {"type": "message_stop"}
+
+
+def _error_body(kind, text):
+    return {"type": "error", "error": {"type": kind, "message": text}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "DinkyDashMockAnthropic/1.0"
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def log_message(self, format, *args):
+        pass  # one line per request drowns out everything else under load
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("request-id", "req_mock_" + uuid.uuid4().hex[:16])
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return None
+
+    @property
+    def route(self):
+        return self.path.split("?", 1)[0]
+
+    def do_GET(self):
+        if self.route == "/calendar.ics":
+            self.settings.count("calendar")
+            data = CALENDAR.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/calendar")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if self.route == "/stats":
+            with self.settings.lock:
+                stats = dict(self.settings.stats)
+            self.send_json(200, stats)
+            return
+        match = _BATCH_PATH.match(self.route)
+        batch = self.settings.batches.get(match.group(1)) if match else None
+        if batch is None:
+            self.send_json(404, _error_body("not_found_error", "Not found"))
+        elif match.group(2):
+            self.send_batch_results(batch)
+        else:
+            self.send_json(200, self.batch_status(batch))
+
+    def do_POST(self):
+        params = self.read_json()
+        if params is None:
+            self.send_json(400, _error_body("invalid_request_error", "Body is not JSON"))
+        elif self.route == "/v1/messages":
+            self.create_message(params)
+        elif self.route == "/v1/messages/batches":
+            self.create_batch(params)
+        else:
+            self.send_json(404, _error_body("not_found_error", "Not found"))
+
+    def create_message(self, params):
+        settings = self.settings
+        settings.count("messages")
+        if params.get("stream"):
+            settings.count("streamed")
+        outcome = settings.outcome()
+        if outcome == "rate_limited":
+            # Rejected before any work, like the real rate limiter.
+            settings.count("rate_limited")
+            self.send_json(429, _error_body("rate_limit_error", "Rate limited (mock)"),
+                           headers=[("retry-after", "1")])
+            return
+        if params.get("stream") and outcome != "overloaded":
+            self.stream_message(params, outcome)
+            return
+        time.sleep(settings.sample_latency(params.get("model", "")))
+        if outcome == "overloaded":
+            settings.count("overloaded")
+            self.send_json(529, _error_body("overloaded_error", "Overloaded (mock)"))
+            return
+        settings.count(outcome)
+        self.send_json(200, message(settings, params, outcome))
+
+    def stream_message(self, params, outcome):
+        settings = self.settings
+        # Headers and message_start go out at once; the latency is spent
+        # before the first text delta, as with the real API.
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        first_token_delay = settings.sample_latency(params.get("model", ""))
+        try:
+            for name, event in stream_events(message(settings, params, outcome)):
+                if name == "content_block_delta" and first_token_delay:
+                    time.sleep(first_token_delay)
+                    first_token_delay = 0
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            settings.count("abandoned")  # the client hung up, e.g. a lost hedge
+            return
+        settings.count(outcome)
+
+    def create_batch(self, params):
+        settings = self.settings
+        settings.count("batches")
+        batch = {
+            "id": "msgbatch_mock_" + uuid.uuid4().hex[:24],
+            "created_at": datetime.now(timezone.utc),
+            "results": [
+                {"custom_id": request["custom_id"],
+                 "outcome": settings.outcome(),
+                 "params": request.get("params", {})}
+                for request in params.get("requests", [])
+            ],
+        }
+        with settings.lock:
+            settings.batches[batch["id"]] = batch
+        self.send_json(200, self.batch_status(batch))
+
+    def batch_status(self, batch):
+        created = batch["created_at"]
+        ended = created + timedelta(seconds=self.settings.batch_seconds)
+        done = datetime.now(timezone.utc) >= ended
+        counts = Counter(
+            "errored" if r["outcome"] in ("rate_limited", "overloaded") else "succeeded"
+            for r in batch["results"]
+        ) if done else Counter()
+        host = self.headers.get("Host", "127.0.0.1")
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if done else "in_progress",
+            "request_counts": {
+                "processing": 0 if done else len(batch["results"]),
+                "succeeded": counts["succeeded"],
+                "errored": counts["errored"],
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": created.isoformat(),
+            "expires_at": (created + timedelta(hours=24)).isoformat(),
+            "ended_at": ended.isoformat() if done else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": (f"http://{host}/v1/messages/batches/{batch['id']}/results"
+                            if done else None),
+        }
+
+    def send_batch_results(self, batch):
+        if self.batch_status(batch)["processing_status"] != "ended":
+            self.send_json(400, _error_body("invalid_request_error", "Batch still in progress"))
+            return
+        lines = []
+        for r in batch["results"]:
+            if r["outcome"] in ("rate_limited", "overloaded"):
+                result = {"type": "errored",
+                          "error": _error_body("overloaded_error", "Overloaded (mock)")}
+            else:
+                result = {"type": "succeeded",
+                          "message": message(self.settings, r["params"], r["outcome"])}
+            lines.append(json.dumps({"custom_id": r["custom_id"], "result": result}))
+        data = ("\n".join(lines) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/binary")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 refuses connections once a few dozen
+    # families connect at once, and the harness would report the stand-in's
+    # accept queue as retries and tail latency of the code under test.
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=8765, settings=None):
+    server = Server((host, port), Handler)
+    server.settings = settings or Settings()
+    return server
+
+
+def serve_in_thread(host="127.0.0.1", port=0, settings=None):
+    """Start a server on a background thread; returns (server, base_url).
+
+    Port 0 picks a free port. Call server.shutdown() to stop it.
+    """
+    server = make_server(host, port, settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_arguments(parser):
+    """Server options, shared with throughput.py."""
+    parser.add_argument("--latency", default="800",
+                        help="Messages latency spec in ms (default: 800)")
+    parser.add_argument("--model-latency", action="append", default=[],
+                        metavar="MODEL=SPEC",
+                        help="latency for models starting with MODEL (repeatable)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of calls failing with 529 overloaded")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="share of calls rejected with 429")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0,
+                        help="share of replies that aren't valid JSON")
+    parser.add_argument("--responses",
+                        help="JSON file with a list of replies to pick from")
+    parser.add_argument("--batch-seconds", type=float, default=5.0,
+                        help="how long a batch stays in progress (default: 5)")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable runs")
+
+
+def settings_from_args(args):
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+    model_latency = {}
+    for item in args.model_latency:
+        prefix, sep, spec = item.partition("=")
+        if not sep:
+            raise ValueError(f"Bad --model-latency {item!r}, expected MODEL=SPEC")
+        model_latency[prefix] = spec
+    return Settings(
+        latency=args.latency,
+        model_latency=model_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        invalid_json_rate=args.invalid_json_rate,
+        responses=responses,
+        batch_seconds=args.batch_seconds,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        settings = settings_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    server = make_server(args.host, args.port, settings)
+    print(f"Mock Anthropic API on http://{args.host}:{args.port} "
+          f"(calendar at /calendar.ics, counters at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
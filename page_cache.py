@@ -0,0 +1,76 @@
+"""
+Rendered-page cache for the dashboard screens
+
+Every screen reloads its dashboard every few minutes, but a family's page only
+changes when a new generation lands. PageCache keeps rendered pages in memory
+so a reload costs a dict lookup instead of a database read and a template
+render. It is bounded by total bytes, not entry count, because pages vary in
+size and the host may be a small VPS or a Pi.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class PageCache:
+    """Thread-safe LRU of rendered pages, capped at `max_bytes` of content."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached body for `key`, or None on a miss."""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """Cache `body` (bytes) under `key`, evicting the least recently used."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when `key` is None."""
+        with self._lock:
+            if key is None:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._size = 0
+            elif key in self._entries:
+                self._size -= len(self._entries.pop(key))
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
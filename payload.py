@@ -0,0 +1,77 @@
+"""
+The dashboard payload: what generate.py writes and app.py reads
+
+Only the fields the screens actually draw (templates/index.html and
+frames.py) are kept, so nothing the model or the calendar adds on the way
+ends up in the file every worker parses. The file is compact JSON, or
+MessagePack when data_file ends in .msgpack, which is smaller still and
+quicker to load.
+"""
+
+import json
+from pathlib import Path
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_SUFFIXES = (".msgpack",)
+
+# Everything a screen draws. A tuple lists the fields kept from each item of
+# a list, a dict the fields kept from a mapping; None keeps a value as is.
+SCHEMA = {
+    "generated_at": None,
+    "generated_date": None,
+    "today_display": None,
+    "chores": ("title", "emoji", "image", "assigned_to"),
+    "countdowns": ("title", "emoji", "image", "days"),
+    "ai_content": {
+        "headline": None,
+        "fun_fact": None,
+        "daily_challenge": None,
+        "pet_corner": None,
+        "events": ("title", "commentary"),
+    },
+}
+
+
+def _kept(value):
+    return value is not None and value != ""
+
+
+def project(data, schema=SCHEMA):
+    """Return `data` cut down to `schema`, also dropping empty values."""
+    if schema is None:
+        return data
+    if isinstance(schema, tuple):
+        return [{k: item[k] for k in schema if _kept(item.get(k))}
+                for item in data or () if isinstance(item, dict)]
+    data = data if isinstance(data, dict) else {}
+    return {key: project(data[key], sub) for key, sub in schema.items()
+            if _kept(data.get(key))}
+
+
+def is_msgpack(path):
+    return Path(path).suffix.lower() in MSGPACK_SUFFIXES
+
+
+def dumps(data, path):
+    """Encode a payload for the file at `path` (its suffix picks the format)."""
+    if is_msgpack(path):
+        if msgpack is None:
+            raise RuntimeError(f"{path}: writing MessagePack needs the msgpack package")
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load(path):
+    """Read a payload file written by dumps(). Raises OSError if it can't be
+    read and ValueError if it isn't a payload."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if is_msgpack(path):
+        if msgpack is None:
+            raise ValueError(f"{path}: reading MessagePack needs the msgpack package")
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
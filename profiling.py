@@ -0,0 +1,188 @@
+"""
+On-demand profiling for DinkyDash
+
+Two tools for finding out why something is slow or big on the Pi itself,
+rather than on a machine where the problem doesn't reproduce:
+
+- StageProfiler, behind `python generate.py --profile`: cProfile and
+  tracemalloc around each stage of a generation run, one report per stage.
+- sample_stacks() and memory_report(), behind app.py's /debug/ endpoints: a
+  sampling profiler for a running server (cheap enough to point at live
+  traffic, unlike cProfile) and a snapshot of memory by allocation site.
+
+Everything here is stdlib and costs nothing until it's used.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+# Frames kept per allocation. The reports only group by the innermost one,
+# and each extra frame makes tracing markedly slower (importing the
+# anthropic SDK takes ~5x longer with 10 frames than with 1).
+TRACEMALLOC_FRAMES = 1
+
+
+# ---------------------------------------------------------------------------
+# Generation stages
+# ---------------------------------------------------------------------------
+
+class StageProfiler:
+    """Profile named stages into `out_dir`; a no-op when `out_dir` is None.
+
+    Each stage writes NN-name.prof (load it with pstats or snakeviz) and
+    NN-name.txt with the hottest functions and the allocation sites that
+    grew the most. summary.txt lists every stage's wall time, CPU time
+    and peak traced memory.
+
+    cProfile only sees the thread that enabled it, so work handed to other
+    threads shows up as waiting; callers should run stages on one thread
+    while profiling.
+    """
+
+    def __init__(self, out_dir=None):
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.rows = []
+        if self.out_dir:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @property
+    def enabled(self):
+        return self.out_dir is not None
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        prefix = f"{len(self.rows) + 1:02d}-{name}"
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            self._write_stage(prefix, profile, before, after)
+            self.rows.append((name, wall, cpu, peak))
+            log.info("Profiled %s: %.2fs wall, %.2fs CPU, peak %.1f MiB",
+                     name, wall, cpu, peak / 2**20)
+
+    def _write_stage(self, prefix, profile, before, after):
+        profile.dump_stats(self.out_dir / f"{prefix}.prof")
+        out = io.StringIO()
+        out.write("Hottest functions by cumulative time\n\n")
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(30)
+        out.write("\nAllocation sites that grew the most during the stage\n\n")
+        for diff in after.compare_to(before, "lineno")[:20]:
+            out.write(f"{diff}\n")
+        (self.out_dir / f"{prefix}.txt").write_text(out.getvalue())
+
+    def write_summary(self):
+        if not self.enabled:
+            return
+        lines = [f"{'stage':<14}{'wall s':>9}{'CPU s':>9}{'peak MiB':>10}"]
+        for name, wall, cpu, peak in self.rows:
+            lines.append(f"{name:<14}{wall:>9.3f}{cpu:>9.3f}{peak / 2**20:>10.1f}")
+        (self.out_dir / "summary.txt").write_text("\n".join(lines) + "\n")
+        log.info("Profile written to %s", self.out_dir)
+
+
+# ---------------------------------------------------------------------------
+# Live server
+# ---------------------------------------------------------------------------
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds, interval=0.005):
+    """Sample every other thread's stack for `seconds`.
+
+    Returns a Counter of stacks, each a tuple of frame names from the
+    outermost call inwards. Threads stay untouched: this only reads
+    sys._current_frames(), so a slow request is seen as it really runs.
+    """
+    me = threading.get_ident()
+    stacks = Counter()
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stacks[tuple(reversed(stack))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_samples(stacks, top=30):
+    """Text report of sample_stacks(): where threads are (self) and what
+    they are inside of (cumulative), as shares of all samples."""
+    total = sum(stacks.values())
+    if not total:
+        return "No samples.\n"
+    own = Counter()
+    inside = Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for name in set(stack):
+            inside[name] += count
+
+    lines = [f"{total} samples", "", f"{'self':>7}  function"]
+    lines += [f"{n / total:>7.1%}  {name}" for name, n in own.most_common(top)]
+    lines += ["", f"{'total':>7}  function"]
+    lines += [f"{n / total:>7.1%}  {name}" for name, n in inside.most_common(top)]
+    return "\n".join(lines) + "\n"
+
+
+def format_folded(stacks):
+    """sample_stacks() in the folded format flamegraph.pl and speedscope read."""
+    return "".join(f"{';'.join(stack)} {count}\n"
+                   for stack, count in stacks.most_common())
+
+
+def memory_report(top=25):
+    """Current traced memory by allocation site, biggest first.
+
+    Only allocations made since tracemalloc started are seen, so it should
+    be started early (PYTHONTRACEMALLOC=1) for a complete picture.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    stats = snapshot.statistics("lineno")
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"traced: {current / 2**20:.1f} MiB now, {peak / 2**20:.1f} MiB peak",
+             f"{len(stats)} allocation sites", ""]
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  "
+                     f"{frame.filename}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
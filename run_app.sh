@@ -1,5 +1,4 @@
 #!/bin/bash
 cd /home/pi/dinkydash
 source venv/bin/activate
-export FLASK_APP=app.py
-flask run --host=0.0.0.0
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py wsgi:app
@@ -0,0 +1,198 @@
+"""
+DinkyDash generations store
+
+SQLite storage for generated dashboards, so one host can serve many families
+instead of a single dashboard_data.json. generate.py writes one row per family
+per day; app.py reads the latest good one.
+
+The database runs in WAL mode: the nightly writer never blocks the screens
+reading, and readers never see a half-written payload.
+
+Each screen gets its own unguessable URL, /s/<token>, from:
+
+    python store.py --db dinkydash.db add-screen <family_id>
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sqlite3
+from datetime import date, datetime
+
+# Screen URLs are bearer tokens, so they must be unguessable.
+SCREEN_TOKEN_BYTES = 24
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id                 INTEGER PRIMARY KEY,
+    family_id          TEXT NOT NULL,
+    generated_for_date TEXT NOT NULL,
+    generated_at       TEXT NOT NULL,
+    status             TEXT NOT NULL,
+    payload            TEXT,
+    error              TEXT,
+    UNIQUE (family_id, generated_for_date)
+);
+
+-- Serves latest_payload() as a single index seek. Partial, so failed rows
+-- never have to be stepped over to find the last good one.
+CREATE INDEX IF NOT EXISTS generations_latest_ok
+    ON generations (family_id, generated_for_date DESC)
+    WHERE status = 'ok';
+
+CREATE TABLE IF NOT EXISTS screens (
+    token      TEXT PRIMARY KEY,
+    family_id  TEXT NOT NULL,
+    created_at TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS screens_family ON screens (family_id);
+"""
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+def connect(path, timeout=10.0, check_same_thread=True):
+    """Open the store at `path`, creating the schema if needed.
+
+    A connection stays on the thread that opened it unless
+    `check_same_thread` is False, in which case the caller serialises access.
+    """
+    conn = sqlite3.connect(
+        str(path), timeout=timeout, check_same_thread=check_same_thread
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable across application crashes in WAL mode; only a power
+    # cut can lose the last commit, and tomorrow's run regenerates it anyway.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def save_generation(conn, family_id, generated_for_date, generated_at, payload):
+    """Store a successful generation, replacing any earlier one for that day."""
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO generations
+                (family_id, generated_for_date, generated_at, status, payload, error)
+            VALUES (?, ?, ?, ?, ?, NULL)
+            ON CONFLICT (family_id, generated_for_date) DO UPDATE SET
+                generated_at = excluded.generated_at,
+                status       = excluded.status,
+                payload      = excluded.payload,
+                error        = NULL
+            """,
+            (
+                family_id,
+                _isoformat(generated_for_date),
+                _isoformat(generated_at),
+                STATUS_OK,
+                json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+            ),
+        )
+
+
+def record_failure(conn, family_id, generated_for_date, generated_at, error):
+    """Record a failed generation.
+
+    A failed re-run never overwrites a payload that already succeeded for the
+    same day — keeping the last good dashboard on screen is the whole point.
+    """
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO generations
+                (family_id, generated_for_date, generated_at, status, payload, error)
+            VALUES (?, ?, ?, ?, NULL, ?)
+            ON CONFLICT (family_id, generated_for_date) DO UPDATE SET
+                generated_at = excluded.generated_at,
+                error        = excluded.error
+            WHERE generations.status != 'ok'
+            """,
+            (
+                family_id,
+                _isoformat(generated_for_date),
+                _isoformat(generated_at),
+                STATUS_FAILED,
+                str(error),
+            ),
+        )
+
+
+def latest_payload(conn, family_id):
+    """Return the most recent successful payload for a family, or None."""
+    row = conn.execute(
+        """
+        SELECT payload FROM generations
+        WHERE family_id = ? AND status = 'ok'
+        ORDER BY generated_for_date DESC
+        LIMIT 1
+        """,
+        (family_id,),
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def register_screen(conn, token, family_id):
+    """Point a screen token at a family, replacing any previous mapping."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO screens (token, family_id, created_at) "
+            "VALUES (?, ?, ?)",
+            (token, family_id, datetime.now().isoformat()),
+        )
+
+
+def add_screen(conn, family_id):
+    """Mint a new screen token for a family and return it."""
+    token = secrets.token_urlsafe(SCREEN_TOKEN_BYTES)
+    register_screen(conn, token, family_id)
+    return token
+
+
+def family_for_token(conn, token):
+    """Return the family a screen token belongs to, or None if unknown."""
+    row = conn.execute(
+        "SELECT family_id FROM screens WHERE token = ?", (token,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def data_version(conn):
+    """Return a value that changes whenever another connection commits.
+
+    Answered from the WAL index without reading any table, so it is cheap
+    enough to poll on every request to notice a new generation landing.
+    """
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the DinkyDash generations store.")
+    parser.add_argument("--db", default=os.environ.get("DINKYDASH_DB"),
+                        help="database file (default: $DINKYDASH_DB)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add-screen",
+                              help="give a screen its own URL for a family's dashboard")
+    add.add_argument("family_id", help="the family_id set in that family's config")
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("no database: pass --db or set DINKYDASH_DB")
+
+    conn = connect(args.db)
+    try:
+        token = add_screen(conn, args.family_id)
+    finally:
+        conn.close()
+    print(f"/s/{token}")
+
+
+if __name__ == "__main__":
+    main()
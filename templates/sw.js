@@ -0,0 +1,90 @@
+// DinkyDash service worker, shell {{ version }}
+//
+// Keeps screens showing the last good dashboard through a Pi restart or a
+// network drop. Pages are answered from cache straight away and checked in
+// the background with If-None-Match, so an unchanged dashboard costs one 304
+// and no body; when a new one arrives it is cached and the screen reloads
+// into it. Static files and fonts are stale-while-revalidate.
+
+const VERSION = "{{ version }}";
+const ASSETS = "dinkydash-assets-" + VERSION;
+// Not versioned: a deploy must not throw away the last good dashboard.
+const PAGES = "dinkydash-pages";
+const PRECACHE = {{ precache | tojson }};
+const FONT_HOSTS = ["fonts.googleapis.com", "fonts.gstatic.com"];
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(
+    caches.open(ASSETS)
+      .then((cache) => cache.addAll(PRECACHE))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(keys
+        .filter((key) => key.startsWith("dinkydash-assets-") && key !== ASSETS)
+        .map((key) => caches.delete(key))))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+  const url = new URL(request.url);
+  if (request.mode === "navigate" && url.origin === location.origin) {
+    event.respondWith(dashboard(event));
+  } else if ((url.origin === location.origin && url.pathname.startsWith("/static/"))
+             || FONT_HOSTS.includes(url.hostname)) {
+    event.respondWith(staleWhileRevalidate(event));
+  }
+});
+
+// Fetch a page unless the cached copy is still current. Resolves to the new
+// response, or null when the server says nothing changed. Only responses
+// with an ETag are real dashboards; the "waiting" page is never cached.
+async function revalidate(cache, url, cached) {
+  const headers = new Headers();
+  const etag = cached && cached.headers.get("ETag");
+  if (etag) headers.set("If-None-Match", etag);
+  const response = await fetch(url, { headers, cache: "no-store", credentials: "same-origin" });
+  if (response.status === 304) return null;
+  if (response.ok && response.headers.get("ETag")) {
+    await cache.put(url, response.clone());
+  }
+  return response;
+}
+
+async function dashboard(event) {
+  const url = event.request.url;
+  const cache = await caches.open(PAGES);
+  const cached = await cache.match(url);
+  const fresh = revalidate(cache, url, cached);
+  if (!cached) return fresh;
+
+  event.waitUntil(fresh.then(async (response) => {
+    if (response && response.ok && response.headers.get("ETag")) {
+      const windows = await self.clients.matchAll({ type: "window" });
+      windows.forEach((client) => client.postMessage({ type: "dashboard-updated", url }));
+    }
+  }).catch(() => {}));  // offline: the cached page is all there is
+  return cached;
+}
+
+async function staleWhileRevalidate(event) {
+  const cache = await caches.open(ASSETS);
+  const cached = await cache.match(event.request);
+  const fresh = fetch(event.request).then((response) => {
+    // Cross-origin font CSS comes back opaque; it is still worth keeping.
+    if (response.ok || response.type === "opaque") {
+      cache.put(event.request, response.clone());
+    }
+    return response;
+  });
+  if (!cached) return fresh;
+  event.waitUntil(fresh.catch(() => {}));
+  return cached;
+}
@@ -0,0 +1,376 @@
+"""Calendar parsing and feed-merge tests for generate.py.
+
+Run with:  python3 -m unittest discover tests
+
+Feeds are inline iCal text; nothing here touches the network.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time as time_module
+import unittest
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generate  # noqa: E402
+from generate import (  # noqa: E402
+    CalendarEvent,
+    feed_occurrences,
+    fetch_calendar_events,
+    format_event_date,
+    merge_feeds,
+    parse_feed,
+)
+
+UTC = timezone.utc
+WINDOW_START = datetime(2026, 8, 10, tzinfo=UTC)
+WINDOW_END = WINDOW_START + timedelta(days=14)
+
+
+def ical(*events):
+    return "\r\n".join(
+        ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//test//EN"]
+        + [line for ev in events for line in ev]
+        + ["END:VCALENDAR", ""]
+    )
+
+
+def vevent(uid, summary, dtstart, extra=()):
+    return ["BEGIN:VEVENT", f"UID:{uid}", f"SUMMARY:{summary}",
+            f"DTSTART{dtstart}", *extra, "END:VEVENT"]
+
+
+def occurrences(text):
+    return list(feed_occurrences(parse_feed(text), WINDOW_START, WINDOW_END))
+
+
+class TestFeedOccurrences(unittest.TestCase):
+    def test_ordered_by_time_not_by_weekday_name(self):
+        # Alphabetically "Friday" < "Monday" < "Tuesday"; chronologically the
+        # Monday event comes first.
+        text = ical(
+            vevent(1, "Tuesday thing", ":20260811T090000Z"),
+            vevent(2, "Friday thing", ":20260814T090000Z"),
+            vevent(3, "Monday thing", ":20260810T083000Z"),
+        )
+        self.assertEqual(
+            [e.summary for e in occurrences(text)],
+            ["Monday thing", "Tuesday thing", "Friday thing"],
+        )
+
+    def test_starts_are_timezone_aware(self):
+        text = ical(
+            vevent(1, "Floating", ":20260811T090000"),
+            vevent(2, "All day", ";VALUE=DATE:20260812"),
+            vevent(3, "Zoned", ";TZID=Europe/Berlin:20260813T090000"),
+        )
+        events = occurrences(text)
+        self.assertTrue(all(e.start.tzinfo is not None for e in events))
+        self.assertEqual([e.all_day for e in events], [False, True, False])
+
+    def test_window_end_is_exclusive_and_recurrences_expand(self):
+        text = ical(vevent(1, "Daily", ":20260801T070000Z", ["RRULE:FREQ=DAILY"]))
+        events = occurrences(text)
+        self.assertEqual(len(events), 14)
+        self.assertEqual(events[0].start, datetime(2026, 8, 10, 7, tzinfo=UTC))
+
+    def test_attendee_filter(self):
+        text = ical(
+            vevent(1, "Both", ":20260811T090000Z",
+                   ["ATTENDEE:mailto:a@example.com", "ATTENDEE:mailto:B@example.com"]),
+            vevent(2, "Only a", ":20260812T090000Z", ["ATTENDEE:mailto:a@example.com"]),
+            vevent(3, "Nobody", ":20260813T090000Z"),
+        )
+        stats = {}
+        events = generate.filter_attendees(
+            occurrences(text), frozenset({"a@example.com", "b@example.com"}), stats)
+        self.assertEqual([e.summary for e in events], ["Both"])
+        self.assertEqual(stats["skipped"], 2)
+
+
+@unittest.skipUnless(hasattr(time_module, "tzset"), "needs time.tzset")
+class TestLocalTime(unittest.TestCase):
+    """Floating and all-day starts across a DST change (US clocks go back on
+    2026-11-01)."""
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"TZ": "America/New_York"})
+        patcher.start()
+        self.addCleanup(time_module.tzset)
+        self.addCleanup(patcher.stop)
+        time_module.tzset()
+
+    def fetch(self, *events):
+        url = "https://a.example/cal.ics"
+        resp = mock.Mock(text=ical(*events))
+        with mock.patch.object(generate.requests, "get", return_value=resp):
+            return fetch_calendar_events(url, today=date(2026, 10, 25))
+
+    def test_floating_time_keeps_its_wall_clock_hour(self):
+        events = self.fetch(vevent(1, "Floating", ":20261103T090000"),
+                            vevent(2, "Zoned", ";TZID=America/New_York:20261103T090000"))
+        self.assertEqual([format_event_date(e) for e in events],
+                         ["Tuesday, November 03 at 09:00 AM"] * 2)
+
+    def test_all_day_starts_at_its_own_midnight(self):
+        (event,) = self.fetch(vevent(1, "All day", ";VALUE=DATE:20261103"))
+        self.assertEqual(event.start.utcoffset(), timedelta(hours=-5))
+        self.assertEqual(event.start.astimezone().hour, 0)
+
+    def test_window_ends_at_local_midnight(self):
+        events = self.fetch(vevent(1, "Last", ";TZID=America/New_York:20261107T233000"),
+                            vevent(2, "Too late", ":20261108T000000"))
+        self.assertEqual([e.summary for e in events], ["Last"])
+
+
+def event(day, hour, summary):
+    return CalendarEvent(datetime(2026, 8, day, hour, tzinfo=UTC), False, summary,
+                         None, None)
+
+
+class TestMergeFeeds(unittest.TestCase):
+    def test_interleaves_feeds_by_start(self):
+        school = [event(10, 8, "drop-off"), event(12, 8, "trip")]
+        sports = [event(11, 17, "practice"), event(12, 7, "early match")]
+        merged = merge_feeds([iter(school), iter(sports)])
+        self.assertEqual(
+            [e.summary for e in merged],
+            ["drop-off", "practice", "early match", "trip"],
+        )
+
+    def test_cap_stops_pulling_from_streams(self):
+        pulled = []
+
+        def endless(tag):
+            day = 10
+            while True:
+                pulled.append(tag)
+                yield event(day, 9, tag)
+                day += 1
+
+        merged = merge_feeds([endless("a"), endless("b")], max_events=3)
+        self.assertEqual(len(merged), 3)
+        self.assertLess(len(pulled), 10)
+
+
+class TestSharedOccurrences(unittest.TestCase):
+    def test_readers_share_one_lazy_expansion(self):
+        pulled = []
+
+        def source():
+            for day in range(11, 31):
+                pulled.append(day)
+                yield event(day, 9, f"Day {day}")
+
+        shared = generate.SharedOccurrences(source())
+        first = merge_feeds([iter(shared)], max_events=3)
+        second = merge_feeds([iter(shared)], max_events=5)
+        self.assertEqual([e.summary for e in first], ["Day 11", "Day 12", "Day 13"])
+        self.assertEqual(len(second), 5)
+        self.assertEqual(pulled, list(range(11, 16)))
+
+    def test_concurrent_readers_see_every_occurrence_once(self):
+        shared = generate.SharedOccurrences(
+            event(day % 28 + 1, 9, str(day)) for day in range(200))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(list(shared)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([len(r) for r in results], [200] * 4)
+        self.assertTrue(all(r == results[0] for r in results))
+
+
+class TestFetchCalendarEvents(unittest.TestCase):
+    def fake_get(self, feeds):
+        def get(url, timeout):
+            resp = mock.Mock(text=feeds[url])
+            resp.raise_for_status = mock.Mock()
+            return resp
+        return get
+
+    def test_merges_several_urls(self):
+        feeds = {
+            "https://a.example/cal.ics": ical(vevent(1, "A", ":20260812T090000Z")),
+            "https://b.example/cal.ics": ical(vevent(2, "B", ":20260811T090000Z")),
+        }
+        with mock.patch.object(generate.requests, "get", self.fake_get(feeds)):
+            events = fetch_calendar_events(list(feeds), today=date(2026, 8, 10))
+        self.assertEqual([e.summary for e in events], ["B", "A"])
+
+    def test_failed_feed_does_not_sink_the_others(self):
+        feeds = {"https://a.example/cal.ics": ical(vevent(1, "A", ":20260812T090000Z"))}
+
+        def get(url, timeout):
+            if url not in feeds:
+                raise ConnectionError("down")
+            return self.fake_get(feeds)(url, timeout)
+
+        with mock.patch.object(generate.requests, "get", get):
+            events = fetch_calendar_events(
+                ["https://down.example/cal.ics", *feeds], today=date(2026, 8, 10)
+            )
+        self.assertEqual([e.summary for e in events], ["A"])
+
+    def test_late_or_failed_feed_uses_last_good_copy(self):
+        url = "https://a.example/cal.ics"
+        good = ical(vevent(1, "Cached", ":20260812T090000Z"))
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def hung_get(url, timeout):
+            release.wait()
+            raise ConnectionError("gave up")
+
+        with tempfile.TemporaryDirectory() as cache:
+            with mock.patch.object(generate.requests, "get", self.fake_get({url: good})):
+                fetch_calendar_events(url, cache_dir=cache, today=date(2026, 8, 10))
+            with mock.patch.object(generate.requests, "get", hung_get):
+                events = fetch_calendar_events(url, cache_dir=cache, timeout=0.1,
+                                               today=date(2026, 8, 10))
+        self.assertEqual([e.summary for e in events], ["Cached"])
+
+    def test_error_page_does_not_replace_last_good_copy(self):
+        url = "https://a.example/cal.ics"
+        good = ical(vevent(1, "Cached", ":20260812T090000Z"))
+        with tempfile.TemporaryDirectory() as cache:
+            for text in (good, "<html>Service Unavailable</html>"):
+                with mock.patch.object(generate.requests, "get", self.fake_get({url: text})):
+                    fetch_calendar_events(url, cache_dir=cache, today=date(2026, 8, 10))
+            self.assertEqual(generate._last_good_feed(url, cache), good)
+
+    def test_concurrent_families_share_one_fetch(self):
+        text = ical(
+            vevent(1, "Assembly", ":20260811T090000Z"),
+            vevent(2, "Parents' evening", ":20260812T180000Z",
+                   ["ATTENDEE:mailto:mum@example.com"]),
+        )
+        gets = []
+        release = threading.Event()
+
+        def slow_get(url, timeout):
+            gets.append(url)
+            release.wait(2)
+            return self.fake_get({url: text})(url, timeout)
+
+        results = {}
+
+        def family(name, url, emails):
+            results[name] = [e.summary for e in fetch_calendar_events(
+                url, filter_emails=emails, today=date(2026, 8, 10))]
+
+        threads = [
+            threading.Thread(target=family, args=("all", "webcal://School.example/cal.ics", None)),
+            threading.Thread(target=family, args=("mum", "https://school.example:443/cal.ics",
+                                                  ["Mum@example.com"])),
+        ]
+        with mock.patch.object(generate.requests, "get", slow_get):
+            for t in threads:
+                t.start()
+            while not gets:
+                time_module.sleep(0.01)
+            time_module.sleep(0.1)
+            release.set()
+            for t in threads:
+                t.join()
+        self.assertEqual(gets, ["https://school.example/cal.ics"])
+        self.assertEqual(results, {"all": ["Assembly", "Parents' evening"],
+                                   "mum": ["Parents' evening"]})
+
+    def test_hung_feed_is_shared_read_once_and_does_not_block_exit(self):
+        url = "https://a.example/cal.ics"
+        good = ical(vevent(1, "Cached", ":20260812T090000Z"))
+        release = threading.Event()
+        self.addCleanup(release.set)
+        download_threads = []
+        expand_threads = []
+        real_expand = generate._expand_feed
+
+        def expand(text, start, end):
+            expand_threads.append(threading.current_thread())
+            return real_expand(text, start, end)
+
+        def hung_get(url, timeout):
+            download_threads.append(threading.current_thread())
+            release.wait()
+            raise ConnectionError("gave up")
+
+        with tempfile.TemporaryDirectory() as cache:
+            generate._feed_cache_path(cache, url).write_text(good)
+            with mock.patch.object(generate.requests, "get", hung_get), \
+                    mock.patch.object(generate, "_last_good_feed",
+                                      wraps=generate._last_good_feed) as last_good, \
+                    mock.patch.object(generate, "_expand_feed", expand):
+                for _ in range(3):
+                    events = fetch_calendar_events(url, cache_dir=cache, timeout=0.05,
+                                                   today=date(2026, 8, 10))
+                    self.assertEqual([e.summary for e in events], ["Cached"])
+        self.assertEqual(len(download_threads), 1)
+        self.assertTrue(download_threads[0].daemon)
+        self.assertEqual(last_good.call_count, 1)
+        # Parsed once, on a family's thread where its profile can see it.
+        self.assertEqual(expand_threads, [threading.current_thread()])
+
+    def test_last_good_copy_saved_before_normalization_is_used(self):
+        raw = "webcal://A.example/cal.ics"
+        good = ical(vevent(1, "Cached", ":20260812T090000Z"))
+
+        def down(url, timeout):
+            raise ConnectionError("down")
+
+        with tempfile.TemporaryDirectory() as cache:
+            generate._feed_cache_path(cache, raw).write_text(good)
+            with mock.patch.object(generate.requests, "get", down):
+                events = fetch_calendar_events(raw, cache_dir=cache,
+                                               today=date(2026, 8, 10))
+        self.assertEqual([e.summary for e in events], ["Cached"])
+
+    def test_no_url_configured(self):
+        self.assertEqual(fetch_calendar_events(""), [])
+
+
+class TestNormalizeFeedUrl(unittest.TestCase):
+    def test_spellings_of_one_feed_agree(self):
+        self.assertEqual(
+            {generate.normalize_feed_url(u) for u in (
+                "webcal://Cal.Example.com/x.ics",
+                "https://cal.example.com:443/x.ics#today",
+                " https://CAL.example.com/x.ics ",
+            )},
+            {"https://cal.example.com/x.ics"},
+        )
+        self.assertEqual(generate.normalize_feed_url("http://a.example:8080/x.ics?k=V"),
+                         "http://a.example:8080/x.ics?k=V")
+
+    def test_ipv6_host_keeps_its_brackets(self):
+        self.assertEqual(generate.normalize_feed_url("http://[::1]:8080/cal.ics"),
+                         "http://[::1]:8080/cal.ics")
+        self.assertEqual(generate.normalize_feed_url("https://[FE80::1]:443/cal.ics"),
+                         "https://[fe80::1]/cal.ics")
+
+    def test_bad_port_fails_only_that_feed(self):
+        self.assertEqual(generate.normalize_feed_url(" https://example.com:99999/x.ics"),
+                         "https://example.com:99999/x.ics")
+        with self.assertLogs(generate.log, "WARNING"):
+            self.assertEqual(fetch_calendar_events("https://example.com:99999/x.ics"), [])
+
+
+class TestFormatEventDate(unittest.TestCase):
+    def test_all_day_has_no_time(self):
+        ev = CalendarEvent(datetime.combine(date(2026, 8, 14), time.min, tzinfo=UTC),
+                           True, "x", None, None)
+        self.assertEqual(format_event_date(ev), "Friday, August 14")
+
+    def test_timed_event_includes_time(self):
+        self.assertIn(" at ", format_event_date(event(14, 9, "x")))
+
+
+if __name__ == "__main__":
+    unittest.main()
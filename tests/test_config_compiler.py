@@ -0,0 +1,142 @@
+"""Tests for config validation and the compiled-config cache.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config_compiler  # noqa: E402
+from config_compiler import ConfigError, compile_config  # noqa: E402
+
+CONFIG_YAML = """\
+people:
+  - name: Alice
+    date_of_birth: 2015-03-15
+    sex: female
+  - name: Bob
+    date_of_birth: "2017-06-20"
+    sex: male
+special_dates:
+  - title: Leap day
+    date: "02/29"
+max_tokens: 2048
+"""
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "config.example.yaml"
+
+
+class TestCompile(unittest.TestCase):
+    def test_example_config_is_valid(self):
+        config_compiler.load(EXAMPLE)
+
+    def test_dates_are_preparsed(self):
+        import yaml
+        config = compile_config(yaml.safe_load(CONFIG_YAML))
+        self.assertEqual([p["date_of_birth"] for p in config["people"]],
+                         [date(2015, 3, 15), date(2017, 6, 20)])
+        self.assertEqual(config["special_dates"][0]["month_day"], (2, 29))
+        self.assertEqual(config["pets"], [])
+
+    def test_every_problem_is_reported_with_its_location(self):
+        raw = {
+            "max_tokens": "lots",
+            "people": [
+                {"name": "Alice", "date_of_birth": "2015-15-01", "sex": "female"},
+                {"name": "Alice", "sex": "female", "date_of_birth": "2016-01-01"},
+                {"date_of_birth": "2016-01-01", "sex": "male"},
+            ],
+            "recurring": [{"title": "Set Table", "choices": []}],
+            "special_dates": [{"title": "Bad", "date": "13/40"}],
+            "pets": "Biscuit",
+        }
+        with self.assertRaises(ConfigError) as cm:
+            compile_config(raw)
+        self.assertEqual(cm.exception.problems, [
+            "max_tokens: expected a positive integer, got 'lots'",
+            "pets: expected a list",
+            "people[0].date_of_birth: expected YYYY-MM-DD, got '2015-15-01'",
+            "people[1].name: 'Alice' is listed twice",
+            "people[2].name: missing",
+            "recurring[0].choices: expected a non-empty list of names, got []",
+            "special_dates[0].date: expected MM/DD, got '13/40'",
+        ])
+
+    def test_people_are_required(self):
+        with self.assertRaises(ConfigError):
+            compile_config({"location": "Berlin"})
+        with self.assertRaises(ConfigError):
+            compile_config(None)
+
+    def test_unknown_key_is_only_a_warning(self):
+        with self.assertLogs(config_compiler.log, "WARNING") as logs:
+            compile_config({"people": [{"name": "A", "sex": "f",
+                                        "date_of_birth": "2015-01-01"}],
+                            "calender_url": "https://example.com/cal.ics"})
+        self.assertIn("did you mean calendar_url", logs.output[0])
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "config.yaml"
+        self.path.write_text(CONFIG_YAML)
+        self.cache = Path(tmp.name) / "cache"
+
+    def load_counting_parses(self):
+        real = config_compiler.yaml.safe_load
+        with mock.patch.object(config_compiler.yaml, "safe_load",
+                               side_effect=real) as safe_load:
+            config = config_compiler.load(self.path, self.cache)
+        return config, safe_load.call_count
+
+    def test_unchanged_file_is_not_parsed_again(self):
+        first, parses = self.load_counting_parses()
+        self.assertEqual(parses, 1)
+        with mock.patch.object(Path, "read_bytes", side_effect=AssertionError):
+            second = config_compiler.load(self.path, self.cache)
+        self.assertEqual(second, first)
+
+    def test_touched_but_identical_file_uses_hash(self):
+        self.load_counting_parses()
+        st = self.path.stat()
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        _, parses = self.load_counting_parses()
+        self.assertEqual(parses, 0)
+
+    def test_edited_file_is_recompiled(self):
+        self.load_counting_parses()
+        self.path.write_text(CONFIG_YAML.replace("2048", "1024"))
+        config, parses = self.load_counting_parses()
+        self.assertEqual((parses, config["max_tokens"]), (1, 1024))
+
+    def test_corrupt_cache_is_ignored(self):
+        self.load_counting_parses()
+        for cached in self.cache.iterdir():
+            cached.write_bytes(b"not a pickle")
+        config, parses = self.load_counting_parses()
+        self.assertEqual((parses, config["max_tokens"]), (1, 2048))
+
+    def test_schema_change_recompiles(self):
+        self.load_counting_parses()
+        with mock.patch.object(config_compiler, "SCHEMA_HASH", "edited"):
+            _, parses = self.load_counting_parses()
+        self.assertEqual(parses, 1)
+
+    def test_invalid_file_is_not_cached(self):
+        self.path.write_text("people: []\n")
+        with self.assertRaises(ConfigError):
+            config_compiler.load(self.path, self.cache)
+        self.assertFalse(self.cache.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -93,6 +93,10 @@ class TestComputeBirthdayInfo(unittest.TestCase):
         self.assertEqual(info["days_until_birthday"], 364)
         self.assertEqual(info["turning"], 12)
 
+    def test_accepts_compiled_date_of_birth(self):
+        info = compute_birthday_info(person(dob=date(2015, 3, 15)), date(2026, 3, 10))
+        self.assertEqual(info["days_until_birthday"], 5)
+
     def test_leap_day_birthday_in_common_year_does_not_raise(self):
         # This raised ValueError before the fix, crashing the daily generation
         # for any family with a leap-day birthday.
@@ -128,6 +132,13 @@ class TestComputeSpecialDateInfo(unittest.TestCase):
         )
         self.assertEqual(info["days_until"], 0)
 
+    def test_uses_compiled_month_day(self):
+        info = compute_special_date_info(
+            {"title": "Christmas", "date": "12/25", "month_day": (12, 25)},
+            date(2026, 12, 20),
+        )
+        self.assertEqual(info["days_until"], 5)
+
     def test_passed_date_rolls_to_next_year(self):
         info = compute_special_date_info(
             {"title": "Christmas", "date": "12/25"}, date(2026, 12, 26)
@@ -0,0 +1,106 @@
+"""Tests for the PNG dashboard frames in frames.py and their app.py route.
+
+Run with:  python3 -m unittest discover tests
+
+Skipped when Pillow isn't installed, in which case no frames are drawn.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import frames  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DATA = {
+    "today_display": "Monday, October 19",
+    "chores": [{"title": "Set Table", "emoji": "🍽", "assigned_to": "Alice"}],
+    "countdowns": [{"title": "Christmas", "emoji": "🎄", "days": 67}],
+    "ai_content": {"headline": "Hello 👋", "fun_fact": "Octopuses have three hearts.",
+                   "daily_challenge": "Hop everywhere.", "pet_corner": "Nap time."},
+}
+
+
+class TestParseSpec(unittest.TestCase):
+    def test_specs(self):
+        self.assertEqual(frames.parse_spec("800x480"), (800, 480, "color"))
+        self.assertEqual(frames.parse_spec("800x480-1bit"), (800, 480, "1bit"))
+        for bad in ("800x480-sepia", "800", "../800x480"):
+            with self.assertRaises(ValueError):
+                frames.parse_spec(bad)
+
+
+@unittest.skipIf(Image is None, "Pillow not installed")
+class TestRenderFrames(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def render(self, data, specs=("800x480-1bit",)):
+        return frames.render_frames(data, list(specs), self.dir, "fam/1")
+
+    def test_modes_and_sizes(self):
+        metas = self.render(DATA, ["800x480", "400x240-gray4", "800x480-1bit"])
+        self.assertEqual([m["diff"] for m in metas],
+                         [[0, 0, 800, 480], [0, 0, 400, 240], [0, 0, 800, 480]])
+        with Image.open(frames.frame_path(self.dir, "fam/1", "400x240-gray4")) as im:
+            self.assertEqual((im.size, im.mode), ((400, 240), "L"))
+            self.assertLessEqual(len(im.getcolors()), 4)
+        with Image.open(frames.frame_path(self.dir, "fam/1", "800x480-1bit")) as im:
+            self.assertEqual(im.mode, "1")
+
+    def test_diff_box_covers_only_the_change(self):
+        first, = self.render(DATA)
+        again, = self.render(DATA)
+        self.assertEqual(again, first)
+
+        changed = dict(DATA, ai_content=dict(DATA["ai_content"], pet_corner="Walkies!"))
+        second, = self.render(changed)
+        self.assertEqual(second["previous_etag"], first["etag"])
+        left, top, right, bottom = second["diff"]
+        self.assertGreater(left, 400)  # pet corner is the right-hand box
+        self.assertLess(bottom - top, 100)
+        self.assertEqual(frames.read_meta(self.dir, "fam/1", "800x480-1bit"), second)
+
+
+@unittest.skipIf(Image is None, "Pillow not installed")
+class TestFrameRoute(unittest.TestCase):
+    def setUp(self):
+        import app
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.multiple(app, FRAME_DIR=self.tmp.name, FAMILY_ID="default")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.app.test_client()
+
+    def test_etag_and_diff_headers(self):
+        self.assertEqual(self.client.get("/frame/800x480-1bit.png").status_code, 404)
+        frames.render_frames(DATA, ["800x480-1bit"], self.tmp.name, "default")
+        first = self.client.get("/frame/800x480-1bit.png")
+        self.assertEqual((first.status_code, first.mimetype), (200, "image/png"))
+        self.assertNotIn("X-Frame-Diff", first.headers)
+
+        etag = first.headers["ETag"]
+        cached = self.client.get("/frame/800x480-1bit.png", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+
+        frames.render_frames(dict(DATA, today_display="Tuesday"), ["800x480-1bit"],
+                             self.tmp.name, "default")
+        second = self.client.get("/frame/800x480-1bit.png", headers={"If-None-Match": etag})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(f'"{second.headers["X-Frame-Diff-Base"]}"', etag)
+        self.assertEqual(len(second.headers["X-Frame-Diff"].split(",")), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Tests for the hedged model fallback chain in generate.py.
+
+Run with:  python3 -m unittest discover tests
+
+call_claude is replaced by fakes, so these run without the API or the mock
+server.
+"""
+
+import json
+import sys
+import threading
+import time
+import unittest
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generate  # noqa: E402
+from generate import ClaudeReply, Deadline, hedged_call  # noqa: E402
+
+CONFIG = {"claude_model": "slow", "claude_fallback_models": ["fast", "spare"]}
+VALID = json.dumps({"headline": "hi"})
+
+
+def fake_models(behaviour):
+    """call_claude stand-in: behaviour[model] is (first token delay, text or
+    exception)."""
+    def call_claude(system_prompt, user_prompt, config, timeout=None, model=None,
+                    on_first_token=None, abandon=None):
+        delay, outcome = behaviour[model]
+        if abandon is not None and abandon.wait(delay):
+            raise generate.Abandoned(None)
+        if isinstance(outcome, Exception):
+            raise outcome
+        on_first_token()
+        return ClaudeReply(outcome, None, model, delay)
+    return call_claude
+
+
+def race(behaviour, hedge_after=0.1, config=CONFIG):
+    calls = []
+    done = threading.Event()
+
+    def on_request(model, role, seconds, reply, usage, error):
+        calls.append((model, role, type(error).__name__ if error else "ok"))
+        if len(calls) == len(behaviour):
+            done.set()
+
+    with mock.patch.object(generate, "call_claude", fake_models(behaviour)):
+        try:
+            reply, content = hedged_call("sys", "user", config, Deadline(5),
+                                         hedge_after, on_request)
+        finally:
+            done.wait(2)
+    return reply.model, content, sorted(calls)
+
+
+class TestHedgedCall(unittest.TestCase):
+    def test_fast_primary_is_not_hedged(self):
+        model, content, calls = race({"slow": (0, VALID)}, hedge_after=1)
+        self.assertEqual((model, content), ("slow", {"headline": "hi"}))
+        self.assertEqual(calls, [("slow", "primary", "ok")])
+
+    def test_slow_primary_is_hedged_and_abandoned(self):
+        started = time.monotonic()
+        model, _, calls = race({"slow": (3, VALID), "fast": (0, VALID)})
+        self.assertEqual(model, "fast")
+        self.assertLess(time.monotonic() - started, 2.5)
+        self.assertEqual(calls, [("fast", "hedge", "ok"), ("slow", "primary", "Abandoned")])
+
+    def test_failure_falls_back_immediately(self):
+        model, _, calls = race({"slow": (0, ConnectionError("down")),
+                                "fast": (0, "not json"),
+                                "spare": (0, VALID)}, hedge_after=10)
+        self.assertEqual(model, "spare")
+        self.assertEqual(calls, [("fast", "fallback", "JSONDecodeError"),
+                                 ("slow", "primary", "ConnectionError"),
+                                 ("spare", "fallback", "ok")])
+
+    def test_all_failing_raises_last_error(self):
+        with self.assertRaises(ConnectionError):
+            race({"slow": (0, ConnectionError("down"))}, config={"claude_model": "slow"})
+
+
+class TestHedgeCutoff(unittest.TestCase):
+    def setUp(self):
+        generate._hedge_cutoffs.clear()
+        self.addCleanup(generate._hedge_cutoffs.clear)
+
+    def test_configured_cutoff_wins(self):
+        config = {"claude_hedge_after_seconds": 4}
+        self.assertEqual(generate.hedge_cutoff(config, None, "m"), 4)
+
+    def test_ledger_p95_with_floor(self):
+        with mock.patch.object(generate.ledger, "first_token_p95", return_value=0.5):
+            self.assertEqual(generate.hedge_cutoff({}, Path("l.jsonl"), "m"),
+                             generate.MIN_HEDGE_AFTER_SECONDS)
+        with mock.patch.object(generate.ledger, "first_token_p95", return_value=None):
+            self.assertEqual(generate.hedge_cutoff({}, Path("other.jsonl"), "m"),
+                             generate.DEFAULT_HEDGE_AFTER_SECONDS)
+
+
+class TestRecordAttempt(unittest.TestCase):
+    def test_abandoned_attempt_is_an_estimate_bounded_by_max_tokens(self):
+        usage = SimpleNamespace(input_tokens=1000, output_tokens=10)
+        with mock.patch.object(generate.ledger, "record") as record:
+            generate.record_attempt("ledger.jsonl", "run", "smith", date(2026, 10, 19), 0,
+                                    "claude-sonnet-4-5", "primary", 4.0, None, usage,
+                                    generate.Abandoned(usage), max_tokens=2000)
+        logged = record.call_args[0][1]
+        self.assertEqual((logged["status"], logged["estimated"]), ("abandoned", True))
+        self.assertAlmostEqual(logged["cost_usd"], 0.00315)
+        self.assertAlmostEqual(logged["cost_usd_max"], 0.033)
+
+    def test_answered_attempt_is_exact(self):
+        with mock.patch.object(generate.ledger, "record") as record:
+            generate.record_attempt("ledger.jsonl", "run", "smith", date(2026, 10, 19), 0,
+                                    "claude-sonnet-4-5", "primary", 1.0,
+                                    ClaudeReply(VALID, None, "claude-sonnet-4-5", 0.5),
+                                    None, None, max_tokens=2000)
+        self.assertNotIn("estimated", record.call_args[0][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
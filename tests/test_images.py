@@ -0,0 +1,93 @@
+"""Tests for the website's responsive images in website/images.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "website"))
+
+import images  # noqa: E402
+from images import rewrite_images  # noqa: E402
+
+PICTURES = {
+    "/images/shot.png": {
+        "width": 1200, "height": 600,
+        "sources": [("image/webp", "/images/shot-480w.webp 480w, /images/shot-1200w.webp 1200w")],
+    },
+}
+
+
+class TestRewriteImages(unittest.TestCase):
+    def test_known_image_becomes_a_picture_with_dimensions(self):
+        out = rewrite_images('<p><img src="/images/shot.png" alt="Shot"></p>', PICTURES)
+        self.assertEqual(out, (
+            '<p><picture><source type="image/webp" srcset="/images/shot-480w.webp 480w, '
+            f'/images/shot-1200w.webp 1200w" sizes="{images.SIZES}">'
+            '<img src="/images/shot.png" alt="Shot" width="1200" height="600" '
+            'decoding="async"></picture></p>'
+        ))
+
+    def test_self_closing_tag_stays_self_closing(self):
+        out = rewrite_images('<img src="/images/shot.png" />', PICTURES)
+        self.assertTrue(out.endswith('height="600" decoding="async"/></picture>'))
+
+    def test_given_dimensions_are_kept(self):
+        out = rewrite_images('<img width="300" src="/images/shot.png">', PICTURES)
+        self.assertIn('<img width="300" src="/images/shot.png"></picture>', out)
+        self.assertNotIn('height="600"', out)
+
+    def test_unknown_images_are_left_alone(self):
+        page = '<img src="/images/logo.svg"><img alt="no src"><IMG SRC="/x.png">'
+        self.assertEqual(rewrite_images(page, PICTURES), page)
+
+
+@unittest.skipUnless(images.available_formats(), "Pillow with WebP/AVIF not installed")
+class TestBuildDerivatives(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        patcher = mock.patch.object(images, "CACHE_DIR", str(self.root / "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = self.root / "src" / "shot.png"
+        self.source.parent.mkdir()
+        images.Image.new("RGB", (1200, 600), "teal").save(self.source)
+        self.out = self.root / "docs"
+
+    def build(self, old_entries=None):
+        return images.build_derivatives(
+            [(str(self.source), os.path.join("images", "shot.png")),
+             (str(self.source.with_suffix(".svg")), os.path.join("images", "logo.svg"))],
+            old_entries or {}, lambda p: hashlib.sha256(Path(p).read_bytes()).hexdigest(),
+            str(self.out))
+
+    def test_each_width_and_format_is_published(self):
+        entries, pictures = self.build()
+        exts = [ext for _, ext, _ in images.available_formats()]
+        expected = sorted(f"images/shot-{w}w.{ext}" for w in (480, 960, 1200) for ext in exts)
+        self.assertEqual(sorted(entries[str(self.source)]["outputs"]), expected)
+        for name in expected:
+            self.assertTrue((self.out / name).exists(), name)
+        picture = pictures["/images/shot.png"]
+        self.assertEqual((picture["width"], picture["height"]), (1200, 600))
+        self.assertEqual([mime for mime, _ in picture["sources"]],
+                         [mime for mime, _, _ in images.available_formats()])
+        self.assertNotIn("/images/logo.svg", pictures)
+
+    def test_unchanged_image_is_not_encoded_again(self):
+        entries, _ = self.build()
+        with mock.patch.object(images.Image, "open", side_effect=AssertionError):
+            again, _ = self.build(entries)
+        self.assertEqual(again, entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Tests for the API usage ledger in ledger.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ledger  # noqa: E402
+
+
+def entry(day, family, run_id, latency_ms, status="ok", cost_usd=0.01,
+          model="claude-sonnet-4-5-20250929", attempt=0, role="primary",
+          first_token_ms=None):
+    return {"date": day, "family_id": family, "run_id": run_id, "model": model,
+            "attempt": attempt, "role": role, "status": status,
+            "latency_ms": latency_ms, "first_token_ms": first_token_ms,
+            "cost_usd": cost_usd}
+
+
+class TestCost(unittest.TestCase):
+    def test_dated_snapshot_uses_family_price(self):
+        tokens = {"input_tokens": 1_000_000, "output_tokens": 100_000}
+        self.assertAlmostEqual(ledger.cost_usd("claude-sonnet-4-5-20250929", tokens), 4.5)
+
+    def test_longest_prefix_wins(self):
+        self.assertEqual(ledger.price_for("claude-opus-4-5-20251101")[0], 5.00)
+        self.assertEqual(ledger.price_for("claude-opus-4-1-20250805")[0], 15.00)
+
+    def test_cache_tokens_are_priced(self):
+        tokens = {"cache_creation_input_tokens": 1_000_000,
+                  "cache_read_input_tokens": 1_000_000}
+        self.assertAlmostEqual(ledger.cost_usd("claude-haiku-4-5", tokens), 1.35)
+
+    def test_unknown_model_has_no_cost(self):
+        self.assertIsNone(ledger.cost_usd("some-other-model", {"input_tokens": 5}))
+
+    def test_usage_tokens_handles_missing_usage(self):
+        self.assertEqual(set(ledger.usage_tokens(None).values()), {0})
+        usage = SimpleNamespace(input_tokens=10, output_tokens=2,
+                                cache_read_input_tokens=None)
+        self.assertEqual(ledger.usage_tokens(usage)["input_tokens"], 10)
+
+
+class TestLedgerFile(unittest.TestCase):
+    def test_append_and_read_back_by_date_range(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "ledger.jsonl"
+            for day in ("2026-10-01", "2026-10-02", "2026-10-03"):
+                ledger.record(path, entry(day, "smith", day, 1000))
+            with open(path, "a") as f:
+                f.write('{"date": "2026-10-02", "trunc')  # crash mid-line
+            entries = ledger.read_entries(path, since=date(2026, 10, 2),
+                                          until=date(2026, 10, 3))
+            self.assertEqual([e["date"] for e in entries], ["2026-10-02", "2026-10-03"])
+
+    def test_first_token_p95_needs_enough_recent_samples(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "ledger.jsonl"
+            for ms in range(100, 2000, 100):
+                ledger.record(path, entry("2026-10-01", "a", "r", ms, first_token_ms=ms))
+            model = "claude-sonnet-4-5-20250929"
+            self.assertIsNone(ledger.first_token_p95(path, model))
+            ledger.record(path, entry("2026-10-01", "a", "r", 1, first_token_ms=2000))
+            ledger.record(path, entry("2026-10-01", "a", "r", 1, first_token_ms=9000,
+                                      status="error"))
+            self.assertEqual(ledger.first_token_p95(path, model), 1.9)
+            self.assertIsNone(ledger.first_token_p95(Path(tmp) / "missing", model))
+
+    def test_unwritable_ledger_does_not_raise(self):
+        ledger.record("/nonexistent-dir/ledger.jsonl", entry("2026-10-01", "a", "r", 1))
+
+
+class TestSummarise(unittest.TestCase):
+    def test_latency_spend_and_retries(self):
+        summary = ledger.summarise([
+            entry("2026-10-01", "smith", "r1", 900, status="error", cost_usd=0.0),
+            entry("2026-10-01", "smith", "r1", 1000, attempt=1),
+            entry("2026-10-01", "jones", "r2", 2000, status="abandoned"),
+            entry("2026-10-01", "jones", "r2", 1500, model="claude-haiku-4-5",
+                  role="hedge"),
+            entry("2026-10-02", "smith", "r3", 3000),
+            entry("2026-10-02", "jones", "r4", 500, status="error", cost_usd=0.0),
+        ])
+        latency = summary["latency_ms"]["claude-sonnet-4-5-20250929"]
+        self.assertEqual((latency["calls"], latency["p50"], latency["p95"]), (5, 1000, 3000))
+        self.assertAlmostEqual(summary["spend"]["2026-10-01", "smith"], 0.01)
+        self.assertEqual((summary["runs"], summary["requests"]), (4, 6))
+        self.assertEqual(summary["retried_runs"], 1)
+        self.assertEqual(summary["hedged_runs"], 1)
+        self.assertEqual(summary["failed_runs"], 1)
+        self.assertIn("retry rate: 25.0%", ledger.report(summary))
+
+    def test_abandoned_calls_are_estimates(self):
+        abandoned = dict(entry("2026-10-01", "jones", "r1", 4000, status="abandoned"),
+                         estimated=True, cost_usd_max=0.03)
+        summary = ledger.summarise([abandoned, entry("2026-10-01", "jones", "r1", 1500,
+                                                     first_token_ms=800, role="hedge")])
+        self.assertEqual(summary["estimated_calls"], 1)
+        self.assertAlmostEqual(summary["estimated_extra_usd_max"], 0.02)
+        self.assertIn("up to 0.0200 USD more", ledger.report(summary))
+        # Dropped before its first token: it took at least its whole latency.
+        self.assertEqual(summary["latency_ms"]["claude-sonnet-4-5-20250929"]
+                         ["first_token_p95"], 4000)
+
+
+if __name__ == "__main__":
+    unittest.main()
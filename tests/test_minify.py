@@ -0,0 +1,102 @@
+"""Tests for the website's HTML/CSS/JS minifier in website/minify.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "website"))
+
+from minify import minify_css, minify_html, minify_js  # noqa: E402
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_whitespace_and_comments_go(self):
+        css = """
+        /* header */
+        .a > .b ,
+        .c {
+            margin : 0 ;
+            padding: 1px 2px;
+        }
+        """
+        self.assertEqual(minify_css(css), ".a>.b,.c{margin :0;padding:1px 2px}")
+
+    def test_strings_are_untouched(self):
+        css = """.x::after { content: "/* kept */ ; { }"; font-family: 'A  B', serif; }"""
+        self.assertEqual(minify_css(css),
+                         """.x::after{content:"/* kept */ ; { }";font-family:'A  B',serif}""")
+
+    def test_space_before_a_colon_is_kept(self):
+        # A descendant that is hovered, not a hovered <a>.
+        self.assertEqual(minify_css("a :hover { color: red }"), "a :hover{color:red}")
+        self.assertEqual(minify_css("a:hover { color: red }"), "a:hover{color:red}")
+
+    def test_calc_keeps_its_operator_spaces(self):
+        self.assertEqual(minify_css(".a { width: calc(100% - 2 * 1rem); }"),
+                         ".a{width:calc(100% - 2 * 1rem)}")
+
+    def test_media_query(self):
+        self.assertEqual(minify_css("@media (max-width: 600px) {\n  .a { top: 0; }\n}"),
+                         "@media (max-width:600px){.a{top:0}}")
+
+
+class TestMinifyJs(unittest.TestCase):
+    def test_indentation_blank_lines_and_comment_lines_go(self):
+        js = """
+            // set up
+            const a = 1;
+
+              // more
+            run(a);
+        """
+        self.assertEqual(minify_js(js), "const a = 1;\nrun(a);")
+
+    def test_line_breaks_are_kept_for_semicolon_insertion(self):
+        js = "let a = b\n++c\nreturn\nvalue"
+        self.assertEqual(minify_js(js), js)
+
+    def test_trailing_comment_and_url_in_string_are_kept(self):
+        js = 'fetch("https://example.com/x") // go'
+        self.assertEqual(minify_js(js), js)
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_text_whitespace_collapses_and_comments_go(self):
+        page = "<p>  Hello\n\n   world <!-- note --></p>\n<!--[if IE]>old<![endif]-->"
+        self.assertEqual(minify_html(page),
+                         "<p> Hello\nworld </p>\n<!--[if IE]>old<![endif]-->\n")
+
+    def test_pre_and_textarea_are_untouched(self):
+        for tag in ("pre", "textarea", "PRE"):
+            body = "  line one\n\n      indented  <!-- shown -->\n"
+            page = f"<div>  <{tag} class=\"x\">{body}</{tag}>  </div>"
+            self.assertIn(f"<{tag} class=\"x\">{body}</{tag}>", minify_html(page))
+
+    def test_ld_json_keeps_its_data(self):
+        data = {"@type": "SoftwareApplication", "name": "Dinky  Dash", "offers": [1, 2]}
+        page = ('<script type="application/ld+json">\n'
+                + json.dumps(data, indent=2) + "\n</script>")
+        out = minify_html(page)
+        body = out[out.index(">") + 1:out.index("</script>")]
+        self.assertEqual(json.loads(body), data)
+        self.assertNotIn("\n", body)
+
+    def test_invalid_ld_json_is_left_alone(self):
+        page = '<script type="application/ld+json">{ not json }</script>'
+        self.assertEqual(minify_html(page), page + "\n")
+
+    def test_inline_style_and_script_are_minified_external_script_is_not(self):
+        page = ("<style>\n  a { color : red; }\n</style>"
+                "<script>\n  // hi\n  go()\n</script>"
+                '<script src="/x.js">  keep  </script>')
+        self.assertEqual(minify_html(page),
+                         "<style>a{color :red}</style><script>go()</script>"
+                         '<script src="/x.js">  keep  </script>\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
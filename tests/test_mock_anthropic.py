@@ -0,0 +1,92 @@
+"""Tests for the offline API stand-in in mock_anthropic.py.
+
+Run with:  python3 -m unittest discover tests
+
+Each test starts the mock on a free local port; nothing leaves the machine.
+"""
+
+import json
+import sys
+import unittest
+import urllib.request
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generate  # noqa: E402
+import mock_anthropic  # noqa: E402
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+
+def post(url, body):
+    request = urllib.request.Request(url, json.dumps(body).encode(), method="POST")
+    with urllib.request.urlopen(request) as resp:
+        return json.load(resp)
+
+
+class MockServerTest(unittest.TestCase):
+    settings = {}
+
+    def setUp(self):
+        self.server, self.url = mock_anthropic.serve_in_thread(
+            settings=mock_anthropic.Settings(latency="0", **self.settings))
+        self.addCleanup(self.server.shutdown)
+        self.config = {"anthropic_base_url": self.url, "claude_model": "claude-mock-1"}
+        patcher = mock.patch.dict("os.environ", {"ANTHROPIC_API_KEY": "sk-ant-mock"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@unittest.skipIf(anthropic is None, "anthropic SDK not installed")
+class TestMessages(MockServerTest):
+    def test_call_claude_gets_canned_reply_and_usage(self):
+        reply = generate.call_claude("system", "user prompt", self.config, timeout=5)
+        self.assertEqual(generate.parse_ai_response(reply.text), mock_anthropic.DEFAULT_REPLY)
+        self.assertGreater(reply.usage.input_tokens, 0)
+        self.assertIsNotNone(reply.first_token_seconds)
+        self.assertEqual(self.server.settings.stats["ok"], 1)
+
+
+@unittest.skipIf(anthropic is None, "anthropic SDK not installed")
+class TestRateLimited(MockServerTest):
+    settings = {"rate_limit_rate": 1.0}
+
+    def test_429_reaches_the_caller(self):
+        with self.assertRaises(anthropic.RateLimitError):
+            generate.call_claude("system", "user prompt", self.config, timeout=5)
+
+
+class TestBatches(MockServerTest):
+    settings = {"batch_seconds": 0}
+
+    def test_batch_results(self):
+        batch = post(f"{self.url}/v1/messages/batches", {"requests": [
+            {"custom_id": "family-1", "params": {"model": "m", "messages": []}},
+            {"custom_id": "family-2", "params": {"model": "m", "messages": []}},
+        ]})
+        with urllib.request.urlopen(f"{self.url}/v1/messages/batches/{batch['id']}") as resp:
+            status = json.load(resp)
+        self.assertEqual(status["processing_status"], "ended")
+        with urllib.request.urlopen(status["results_url"]) as resp:
+            results = [json.loads(line) for line in resp.read().splitlines()]
+        self.assertEqual([r["custom_id"] for r in results], ["family-1", "family-2"])
+        self.assertEqual({r["result"]["type"] for r in results}, {"succeeded"})
+
+
+class TestLatencySpec(unittest.TestCase):
+    def test_specs(self):
+        rng = mock_anthropic.random.Random(1)
+        self.assertEqual(mock_anthropic.latency_sampler("250", rng)(), 0.25)
+        self.assertTrue(0.1 <= mock_anthropic.latency_sampler("uniform:100:200", rng)() <= 0.2)
+        self.assertGreater(mock_anthropic.latency_sampler("lognormal:800:0.5", rng)(), 0)
+        with self.assertRaises(ValueError):
+            mock_anthropic.latency_sampler("gamma:1:2", rng)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests for the rendered-page LRU in page_cache.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from page_cache import PageCache  # noqa: E402
+
+
+class TestPageCache(unittest.TestCase):
+    def test_miss_then_hit(self):
+        cache = PageCache(100)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", b"page")
+        self.assertEqual(cache.get("a"), b"page")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = PageCache(10)
+        cache.put("a", b"xxxx")
+        cache.put("b", b"xxxx")
+        cache.get("a")  # b is now the least recently used
+        cache.put("c", b"xxxx")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), b"xxxx")
+        self.assertEqual(cache.get("c"), b"xxxx")
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.stats()["bytes"], 8)
+
+    def test_replacing_an_entry_updates_size(self):
+        cache = PageCache(10)
+        cache.put("a", b"xxxxxxxx")
+        cache.put("a", b"xx")
+        self.assertEqual(cache.stats()["bytes"], 2)
+        self.assertEqual(cache.stats()["evictions"], 0)
+
+    def test_oversized_page_is_not_cached(self):
+        cache = PageCache(4)
+        cache.put("a", b"xx")
+        cache.put("big", b"xxxxxxxx")
+        self.assertIsNone(cache.get("big"))
+        self.assertEqual(cache.get("a"), b"xx")
+
+    def test_invalidate_one_and_all(self):
+        cache = PageCache(100)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.invalidate("a")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), b"2")
+        cache.invalidate()
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["bytes"], 0)
+        self.assertEqual(cache.stats()["invalidations"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
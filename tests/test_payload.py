@@ -0,0 +1,85 @@
+"""Tests for the dashboard payload projection and encodings in payload.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config_compiler  # noqa: E402
+import payload  # noqa: E402
+
+FULL = {
+    "today_display": "Monday, October 19",
+    "people_images": {"Alice": "thumbs/a.jpg"},
+    "calendar_events": [{"summary": "Assembly", "description": "<p>...</p>" * 500}],
+    "chores": [{"title": "Set Table", "emoji": "🍽", "assigned_to": "Alice",
+                "image": "", "extra": 1}],
+    "countdowns": [{"title": "Christmas", "emoji": "🎄", "days": 0, "image": None}],
+    "ai_content": {"headline": "Hi", "events": [{"title": "Swim", "commentary": "Splash",
+                                                "date": "Monday"}],
+                   "fun_fact": "", "mood": "chirpy"},
+}
+
+
+class TestProject(unittest.TestCase):
+    def test_keeps_only_what_screens_draw(self):
+        self.assertEqual(payload.project(FULL), {
+            "today_display": "Monday, October 19",
+            "chores": [{"title": "Set Table", "emoji": "🍽", "assigned_to": "Alice"}],
+            "countdowns": [{"title": "Christmas", "emoji": "🎄", "days": 0}],
+            "ai_content": {"headline": "Hi",
+                           "events": [{"title": "Swim", "commentary": "Splash"}]},
+        })
+
+
+class TestEncoding(unittest.TestCase):
+    def round_trip(self, name):
+        data = payload.project(FULL)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / name
+            path.write_bytes(payload.dumps(data, path))
+            self.assertEqual(payload.load(path), data)
+            return path.read_bytes()
+
+    def test_json_is_compact(self):
+        raw = self.round_trip("dashboard_data.json")
+        self.assertNotIn(b"\n", raw)
+        self.assertNotIn(b": ", raw)
+
+    @unittest.skipIf(payload.msgpack is None, "msgpack not installed")
+    def test_msgpack(self):
+        self.round_trip("dashboard_data.msgpack")
+
+    def test_msgpack_data_file_needs_msgpack(self):
+        with mock.patch.object(payload, "msgpack", None):
+            problems = config_compiler.validate({
+                "data_file": "dashboard_data.msgpack",
+                "people": [{"name": "A", "date_of_birth": "2020-01-01", "sex": "f"}],
+            })
+        self.assertEqual(len(problems), 1)
+        self.assertIn("msgpack", problems[0])
+
+    def test_cached_config_is_rechecked_for_msgpack(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "config.yaml"
+            path.write_text("data_file: dashboard_data.msgpack\npeople:\n"
+                            "  - {name: A, date_of_birth: 2020-01-01, sex: f}\n")
+            with mock.patch.object(payload, "msgpack", object()):
+                config_compiler.load(path, Path(tmp) / "cache")
+            with mock.patch.object(payload, "msgpack", None):
+                with self.assertRaises(config_compiler.ConfigError):
+                    config_compiler.load(path, Path(tmp) / "cache")
+
+    def test_only_msgpack_suffix_selects_msgpack(self):
+        self.assertTrue(payload.is_msgpack("dashboard_data.MSGPACK"))
+        self.assertFalse(payload.is_msgpack("dashboard_data.mpk"))
+
+
+if __name__ == "__main__":
+    unittest.main()
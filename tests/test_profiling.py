@@ -0,0 +1,68 @@
+"""Tests for the profiling helpers in profiling.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import profiling  # noqa: E402
+
+
+def spin(seconds):
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        sum(range(100))
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_disabled_profiler_writes_nothing(self):
+        profiler = profiling.StageProfiler()
+        with profiler.stage("calendar"):
+            pass
+        profiler.write_summary()
+        self.assertEqual(profiler.rows, [])
+
+    def test_writes_a_report_per_stage_and_a_summary(self):
+        self.addCleanup(tracemalloc.stop)
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = profiling.StageProfiler(tmp)
+            with profiler.stage("calendar"):
+                spin(0.01)
+            with profiler.stage("save"):
+                kept = [bytes(1000) for _ in range(100)]  # noqa: F841
+            profiler.write_summary()
+
+            names = sorted(p.name for p in Path(tmp).iterdir())
+            self.assertEqual(names, ["01-calendar.prof", "01-calendar.txt",
+                                     "02-save.prof", "02-save.txt", "summary.txt"])
+            self.assertIn("spin", (Path(tmp) / "01-calendar.txt").read_text())
+            self.assertIn("test_profiling.py", (Path(tmp) / "02-save.txt").read_text())
+            summary = (Path(tmp) / "summary.txt").read_text().splitlines()
+            self.assertEqual([line.split()[0] for line in summary[1:]], ["calendar", "save"])
+
+
+class TestSampling(unittest.TestCase):
+    def test_sees_a_busy_thread(self):
+        worker = threading.Thread(target=spin, args=(0.5,))
+        worker.start()
+        stacks = profiling.sample_stacks(0.2, interval=0.002)
+        worker.join()
+        self.assertTrue(any(stack[-1].startswith("spin ") for stack in stacks))
+        self.assertIn("spin (test_profiling.py", profiling.format_samples(stacks))
+        folded = profiling.format_folded(stacks)
+        self.assertRegex(folded, r"spin \(test_profiling\.py:\d+\) \d+\n")
+
+    def test_no_samples(self):
+        self.assertEqual(profiling.format_samples({}), "No samples.\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests for the /s/<token> screen pages in app.py and their page cache.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+import store  # noqa: E402
+
+
+class TestScreenCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = str(Path(tmp.name) / "dinkydash.db")
+        self.writer = store.connect(self.db)
+        self.addCleanup(self.writer.close)
+        store.register_screen(self.writer, "tok", "smith")
+        self.save("Old news")
+
+        patcher = mock.patch.multiple(app, DB_FILE=self.db,
+                                      _watch={"conn": None, "version": None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        app._local.__dict__.pop("db", None)
+        self.addCleanup(app._local.__dict__.pop, "db", None)
+        app.page_cache.invalidate()
+        self.addCleanup(app.page_cache.invalidate)
+        self.client = app.app.test_client()
+
+    def save(self, headline):
+        store.save_generation(self.writer, "smith", "2026-10-19", "2026-10-19T06:00:00",
+                              {"today_display": "Monday", "ai_content": {"headline": headline}})
+
+    def test_commit_during_render_is_not_cached_stale(self):
+        real_latest = store.latest_payload
+
+        def latest_then_commit(conn, family_id):
+            data = real_latest(conn, family_id)
+            # A new generation lands after this read, and another request
+            # notices it before this one gets to cache its page.
+            self.save("Fresh news")
+            app.check_for_new_generations()
+            return data
+
+        with mock.patch.object(store, "latest_payload", latest_then_commit):
+            self.assertIn(b"Old news", self.client.get("/s/tok").data)
+        self.assertIn(b"Fresh news", self.client.get("/s/tok").data)
+
+    def test_unchanged_page_is_served_from_cache(self):
+        self.client.get("/s/tok")
+        with mock.patch.object(store, "latest_payload") as latest:
+            self.assertIn(b"Old news", self.client.get("/s/tok").data)
+        latest.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Tests for the offline support in app.py: the service worker route and the
+dashboard ETags its background checks rely on.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+import store  # noqa: E402
+
+
+class AppTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.client = app.app.test_client()
+
+    def use_data_file(self, data):
+        path = Path(self.tmp.name) / "dashboard_data.json"
+        if data is not None:
+            path.write_text(json.dumps(data))
+        patcher = mock.patch.multiple(app, DATA_FILE=str(path), DB_FILE=None,
+                                      _payload=(None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestDashboardETag(AppTest):
+    def test_unchanged_dashboard_is_a_304(self):
+        self.use_data_file({"today_display": "Monday", "ai_content": {"headline": "Hi"}})
+        first = self.client.get("/")
+        self.assertEqual(first.status_code, 200)
+        again = self.client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual((again.status_code, again.data), (304, b""))
+
+    def test_waiting_page_has_no_etag(self):
+        self.use_data_file(None)
+        response = self.client.get("/")
+        self.assertIn(b"Waiting for the first daily generation", response.data)
+        self.assertNotIn("ETag", response.headers)
+
+    def test_screen_page_etag(self):
+        db = str(Path(self.tmp.name) / "dinkydash.db")
+        conn = store.connect(db)
+        store.register_screen(conn, "tok", "smith")
+        store.save_generation(conn, "smith", "2026-10-19", "2026-10-19T06:00:00",
+                              {"today_display": "Monday", "ai_content": {}})
+        conn.close()
+        self.addCleanup(app.page_cache.invalidate)
+        with mock.patch.multiple(app, DB_FILE=db, _watch={"conn": None, "version": None}):
+            app._local.__dict__.pop("db", None)
+            first = self.client.get("/s/tok")
+            again = self.client.get("/s/tok", headers={"If-None-Match": first.headers["ETag"]})
+            app._local.__dict__.pop("db", None)
+        self.assertEqual((first.status_code, again.status_code), (200, 304))
+
+
+class TestServiceWorker(AppTest):
+    def test_served_from_root_with_shell_version(self):
+        response = self.client.get("/sw.js")
+        self.assertEqual(response.mimetype, "text/javascript")
+        body = response.get_data(as_text=True)
+        self.assertIn(app.SHELL_VERSION, body)
+        self.assertIn('"/static/favicon.svg"', body)
+
+    def test_page_registers_it(self):
+        self.use_data_file({"today_display": "Monday"})
+        self.assertIn(b'serviceWorker.register("/sw.js")', self.client.get("/").data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Tests for the SQLite generations store in store.py.
+
+Run with:  python3 -m unittest discover tests
+"""
+
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import store  # noqa: E402
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = store.connect(Path(self.tmp.name) / "test.db")
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def save(self, family_id, day, payload):
+        store.save_generation(
+            self.conn, family_id, day, datetime(day.year, day.month, day.day, 6),
+            payload,
+        )
+
+
+class TestConnect(StoreTestCase):
+    def test_uses_wal(self):
+        mode = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+
+class TestGenerations(StoreTestCase):
+    def test_no_generation_yet(self):
+        self.assertIsNone(store.latest_payload(self.conn, "smith"))
+
+    def test_latest_is_most_recent_date(self):
+        self.save("smith", date(2026, 8, 1), {"day": 1})
+        self.save("smith", date(2026, 8, 3), {"day": 3})
+        self.save("smith", date(2026, 8, 2), {"day": 2})
+        self.assertEqual(store.latest_payload(self.conn, "smith"), {"day": 3})
+
+    def test_families_are_kept_apart(self):
+        self.save("smith", date(2026, 8, 1), {"family": "smith"})
+        self.save("jones", date(2026, 8, 2), {"family": "jones"})
+        self.assertEqual(
+            store.latest_payload(self.conn, "smith"), {"family": "smith"}
+        )
+
+    def test_rerun_on_same_day_replaces_payload(self):
+        self.save("smith", date(2026, 8, 1), {"v": 1})
+        self.save("smith", date(2026, 8, 1), {"v": 2})
+        self.assertEqual(store.latest_payload(self.conn, "smith"), {"v": 2})
+        count = self.conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_failed_day_falls_back_to_last_good(self):
+        self.save("smith", date(2026, 8, 1), {"day": 1})
+        store.record_failure(
+            self.conn, "smith", date(2026, 8, 2), datetime(2026, 8, 2, 6), "boom"
+        )
+        self.assertEqual(store.latest_payload(self.conn, "smith"), {"day": 1})
+
+    def test_failed_rerun_keeps_todays_good_payload(self):
+        self.save("smith", date(2026, 8, 2), {"day": 2})
+        store.record_failure(
+            self.conn, "smith", date(2026, 8, 2), datetime(2026, 8, 2, 7), "boom"
+        )
+        self.assertEqual(store.latest_payload(self.conn, "smith"), {"day": 2})
+
+    def test_latest_lookup_is_an_index_seek(self):
+        plan = self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT payload FROM generations "
+            "WHERE family_id = ? AND status = 'ok' "
+            "ORDER BY generated_for_date DESC LIMIT 1",
+            ("smith",),
+        ).fetchall()
+        detail = " ".join(row[-1] for row in plan)
+        self.assertIn("generations_latest_ok", detail)
+        self.assertNotIn("TEMP B-TREE", detail)
+
+
+class TestScreens(StoreTestCase):
+    def test_unknown_token(self):
+        self.assertIsNone(store.family_for_token(self.conn, "nope"))
+
+    def test_token_resolves_to_family(self):
+        store.register_screen(self.conn, "abc123", "smith")
+        self.assertEqual(store.family_for_token(self.conn, "abc123"), "smith")
+
+    def test_reregistering_moves_token(self):
+        store.register_screen(self.conn, "abc123", "smith")
+        store.register_screen(self.conn, "abc123", "jones")
+        self.assertEqual(store.family_for_token(self.conn, "abc123"), "jones")
+
+    def test_add_screen_mints_a_fresh_token(self):
+        first = store.add_screen(self.conn, "smith")
+        second = store.add_screen(self.conn, "smith")
+        self.assertNotEqual(first, second)
+        self.assertGreaterEqual(len(first), 32)
+        self.assertEqual(store.family_for_token(self.conn, second), "smith")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Tests for the avatar thumbnails in thumbnails.py.
+
+Run with:  python3 -m unittest discover tests
+
+Skipped when Pillow isn't installed, in which case thumbnail() passes images
+through unchanged.
+"""
+
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import thumbnails  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ORIENTATION = 0x0112
+
+
+@unittest.skipIf(Image is None, "Pillow not installed")
+class TestThumbnail(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def photo(self, name="alice.jpg", size=(1200, 800), orientation=None):
+        exif = Image.Exif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        if orientation:
+            exif[ORIENTATION] = orientation
+        Image.new("RGB", size, "red").save(self.static / name, exif=exif)
+        return name
+
+    def test_makes_square_thumbnail_of_requested_size(self):
+        thumb = thumbnails.thumbnail(self.static, self.photo(), 96)
+        self.assertTrue(thumb.startswith("thumbs/"))
+        with Image.open(self.static / thumb) as im:
+            self.assertEqual(im.size, (96, 96))
+
+    def test_strips_exif(self):
+        thumb = thumbnails.thumbnail(self.static, self.photo(), 96)
+        with Image.open(self.static / thumb) as im:
+            self.assertEqual(len(im.getexif()), 0)
+
+    def test_applies_exif_orientation(self):
+        # Stored landscape with red on the left, blue on the right. EXIF
+        # orientation 6 means "rotate 90° clockwise to display", which puts
+        # red on top — the thumbnail must be cropped from that view.
+        im = Image.new("RGB", (400, 200), "blue")
+        im.paste("red", (0, 0, 200, 200))
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        im.save(self.static / "rotated.jpg", exif=exif)
+
+        thumb = thumbnails.thumbnail(self.static, "rotated.jpg", 50)
+        with Image.open(self.static / thumb) as out:
+            top, bottom = out.getpixel((25, 5)), out.getpixel((25, 45))
+        self.assertGreater(top[0], top[2])
+        self.assertGreater(bottom[2], bottom[0])
+
+    def test_same_source_and_size_reuses_thumbnail(self):
+        name = self.photo()
+        first = thumbnails.thumbnail(self.static, name, 96)
+        mtime = (self.static / first).stat().st_mtime_ns
+        self.assertEqual(thumbnails.thumbnail(self.static, name, 96), first)
+        self.assertEqual((self.static / first).stat().st_mtime_ns, mtime)
+
+    def test_concurrent_makers_publish_a_whole_file(self):
+        name = self.photo(size=(2400, 1600))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            thumbs = set(pool.map(lambda _: thumbnails.thumbnail(self.static, name, 96),
+                                  range(8)))
+        thumb, = thumbs
+        with Image.open(self.static / thumb) as im:
+            im.load()
+        self.assertEqual(list((self.static / "thumbs").glob("*.tmp")), [])
+
+    def test_changed_photo_gets_new_thumbnail(self):
+        name = self.photo()
+        first = thumbnails.thumbnail(self.static, name, 96)
+        Image.new("RGB", (300, 300), "blue").save(self.static / name)
+        self.assertNotEqual(thumbnails.thumbnail(self.static, name, 96), first)
+
+    def test_different_sizes_are_separate(self):
+        name = self.photo()
+        self.assertNotEqual(
+            thumbnails.thumbnail(self.static, name, 48),
+            thumbnails.thumbnail(self.static, name, 96),
+        )
+
+    def test_missing_image_falls_back_to_original(self):
+        self.assertEqual(thumbnails.thumbnail(self.static, "nope.jpg", 96), "nope.jpg")
+
+    def test_empty_image_passes_through(self):
+        self.assertEqual(thumbnails.thumbnail(self.static, "", 96), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+DinkyDash end-to-end generation throughput test
+
+Runs the real generate.py pipeline — calendar fetch, prompt, API call with
+retries, JSON, store and ledger writes — for many synthetic families at once
+against mock_anthropic.py, entirely offline, and reports families per minute
+and per-family latency. Use it to try scheduling, retry and deadline changes
+before they meet the real API.
+
+Usage:
+    python throughput.py                                   # 1000 families
+    python throughput.py --families 10000 --concurrency 64
+    python throughput.py --latency lognormal:2000:0.6 --rate-limit-rate 0.05
+    python throughput.py --latency lognormal:3000:1 \
+        --model-latency claude-haiku=500 --fallback-models claude-haiku-4-5
+    python throughput.py --url http://127.0.0.1:8765       # a mock already running
+
+Everything a run writes goes to a temporary directory, removed afterwards
+unless --keep is given.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import config_compiler
+import generate
+import ledger
+import mock_anthropic
+
+FIRST_NAMES = ["Alice", "Bob", "Chloe", "Dev", "Emil", "Fatima", "Gus", "Hana",
+               "Ivo", "Jun", "Kai", "Lena", "Mo", "Nia", "Oskar", "Priya"]
+
+
+def synthetic_config(index, base_url, workdir, rng, deadline, fallback_models=()):
+    """A plausible family config, with every output file under `workdir`."""
+    names = rng.sample(FIRST_NAMES, rng.randint(2, 5))
+    people = [
+        {
+            "name": name,
+            "date_of_birth": f"{rng.randint(1975, 2022)}-{rng.randint(1, 12):02d}-"
+                             f"{rng.randint(1, 28):02d}",
+            "sex": rng.choice(["female", "male"]),
+            "image": "",
+            "interests": rng.choice(["dinosaurs", "football", "drawing", "space", ""]),
+        }
+        for name in names
+    ]
+    return {
+        "family_id": f"family-{index:05d}",
+        "location": "Testville",
+        "anthropic_base_url": base_url,
+        "calendar_url": f"{base_url}/calendar.ics",
+        "calendar_cache_dir": str(workdir / "calendar_cache"),
+        "people": people,
+        "pets": [{"name": "Biscuit", "type": "dog", "image": ""}],
+        "recurring": [
+            {"title": "Set Table", "emoji": "🍽", "choices": names},
+            {"title": "Feed Pet", "emoji": "🐕", "choices": names[::-1]},
+        ],
+        "special_dates": [{"title": "Christmas", "emoji": "🎄", "date": "12/25"}],
+        "generation_deadline_seconds": deadline,
+        "claude_fallback_models": list(fallback_models),
+        "data_file": str(workdir / "dashboards" / f"family-{index:05d}.json"),
+        "content_history_file": str(workdir / "history" / f"family-{index:05d}.json"),
+        "database_file": str(workdir / "dinkydash.db"),
+        "ledger_file": str(workdir / "usage_ledger.jsonl"),
+    }
+
+
+def run_family(config):
+    """Generate one family's dashboard; returns (ok, seconds)."""
+    started = time.monotonic()
+    try:
+        generate.generate(config)
+        ok = True
+    except SystemExit:
+        ok = False  # generate() gave up and kept the previous dashboard
+    except Exception as e:
+        logging.getLogger(__name__).warning("%s crashed: %s", config["family_id"], e)
+        ok = False
+    return ok, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="families generated at once (default: 32)")
+    parser.add_argument("--deadline", type=float, default=60,
+                        help="generation_deadline_seconds per family (default: 60)")
+    parser.add_argument("--fallback-models", nargs="*", default=[],
+                        help="claude_fallback_models to hedge with")
+    parser.add_argument("--url", help="use this mock server instead of starting one")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the working directory and print its path")
+    parser.add_argument("--verbose", action="store_true",
+                        help="show generate.py's log output")
+    mock_anthropic.add_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+    # The mock accepts any key; generate() only checks that one is set.
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-mock")
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        try:
+            settings = mock_anthropic.settings_from_args(args)
+        except ValueError as e:
+            parser.error(str(e))
+        server, base_url = mock_anthropic.serve_in_thread(settings=settings)
+
+    workdir = Path(tempfile.mkdtemp(prefix="dinkydash-throughput-"))
+    for sub in ("dashboards", "history"):
+        (workdir / sub).mkdir()
+    rng = random.Random(args.seed)
+    configs = [
+        config_compiler.compile_config(synthetic_config(
+            i, base_url, workdir, rng, args.deadline, args.fallback_models))
+        for i in range(args.families)
+    ]
+
+    try:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(run_family, configs))
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(seconds for _, seconds in results)
+        ok = sum(ok for ok, _ in results)
+        print(f"{args.families} families in {elapsed:.1f}s "
+              f"with {args.concurrency} at a time: "
+              f"{args.families / elapsed * 60:.0f} families/min")
+        print(f"succeeded {ok}, failed {args.families - ok}")
+        print(f"per family: p50 {ledger.percentile(latencies, 50):.2f}s  "
+              f"p95 {ledger.percentile(latencies, 95):.2f}s  "
+              f"p99 {ledger.percentile(latencies, 99):.2f}s  max {latencies[-1]:.2f}s")
+
+        ledger_path = workdir / "usage_ledger.jsonl"
+        summary = ledger.summarise(
+            ledger.read_entries(ledger_path) if ledger_path.exists() else [])
+        retry_rate = summary["retried_runs"] / summary["runs"] if summary["runs"] else 0
+        hedge_rate = summary["hedged_runs"] / summary["runs"] if summary["runs"] else 0
+        print(f"API requests {summary['requests']}, runs needing a retry "
+              f"{retry_rate:.1%}, runs hedged {hedge_rate:.1%}")
+        with urllib.request.urlopen(f"{base_url}/stats") as resp:
+            stats = json.load(resp)
+        print("mock server: " + ", ".join(f"{k} {v}" for k, v in sorted(stats.items())))
+    finally:
+        if server is not None:
+            server.shutdown()
+        if args.keep:
+            print(f"Output kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Display-sized avatar thumbnails
+
+Config images are whatever the family uploaded, often multi-megabyte phone
+photos, but the dashboard draws them as ~40px circles. Decoding a 12MP JPEG
+is the slowest part of a Pi browser's first render, so generate.py points
+the payload at small square thumbnails made here instead.
+
+Thumbnails are named by source hash and size: a photo is only decoded again
+when it changes, and a changed photo never gets served from a stale file.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+log = logging.getLogger(__name__)
+
+THUMB_DIR = "thumbs"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail(static_dir, image, size):
+    """Return the static/-relative path of a `size`px square thumbnail of `image`.
+
+    Falls back to `image` itself when Pillow is missing or the source can't
+    be read, so a thumbnail problem never costs the dashboard its photos.
+    """
+    if not image or Image is None:
+        return image
+    static_dir = Path(static_dir)
+    source = static_dir / image
+    try:
+        source_hash = _file_hash(source)
+    except OSError as e:
+        log.warning("Avatar image %s not readable: %s", source, e)
+        return image
+
+    with_alpha = source.suffix.lower() in (".png", ".webp", ".gif")
+    name = f"{source_hash[:16]}-{size}.{'png' if with_alpha else 'jpg'}"
+    target = static_dir / THUMB_DIR / name
+    relative = f"{THUMB_DIR}/{name}"
+    if target.exists():
+        return relative
+
+    try:
+        with Image.open(source) as im:
+            # draft() lets the JPEG decoder downscale while decoding, far
+            # cheaper than decoding at full size and resizing afterwards.
+            im.draft("RGB", (size * 2, size * 2))
+            # Phones store the camera orientation in EXIF instead of rotating
+            # the pixels; apply it before EXIF is dropped.
+            im = ImageOps.exif_transpose(im)
+            # The dashboard crops avatars to circles with object-fit: cover,
+            # so a centred square crop loses nothing visible.
+            im = ImageOps.fit(im, (size, size), Image.LANCZOS)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # A unique temp file: families sharing a photo may make its
+            # thumbnail at the same moment.
+            fd, tmp = tempfile.mkstemp(dir=str(target.parent), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    # Saving a fresh image (no exif= argument) strips all
+                    # metadata, including any GPS position the photo was
+                    # taken at.
+                    if with_alpha:
+                        im.convert("RGBA").save(f, "PNG", optimize=True)
+                    else:
+                        im.convert("RGB").save(f, "JPEG", quality=82, optimize=True,
+                                               progressive=True)
+                # mkstemp makes it private; thumbnails are public files.
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, target)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+    except Exception as e:
+        log.warning("Could not make thumbnail for %s: %s", source, e)
+        return image
+    return relative
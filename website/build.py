@@ -6,7 +6,8 @@ using Jinja2 templates. It processes content from the 'content/' directory
 and outputs static HTML files to the '../docs/' directory for GitHub Pages.
 
 Usage:
-    python build.py
+    python build.py                 # clean build
+    python build.py --incremental   # only redo what changed since the last build
 
 The build process:
 1. Reads Markdown files from content/ directory
@@ -16,16 +17,41 @@ The build process:
 5. Outputs static HTML with clean URLs (e.g., about.md → about/index.html)
 6. Writes sitemap.xml and robots.txt
 7. Copies images and preserves CNAME file
+8. Encodes AVIF/WebP copies of images at several widths (if Pillow is
+   installed) and rewrites <img> tags into <picture> with srcset
+9. Minifies HTML/CSS/JS, writes assets/ under content-hashed names, and
+   writes .gz (and .br, if the brotli package is installed) beside every
+   text output for servers that serve precompressed files
+
+Every build records a hash of each output's inputs in .build-manifest.json.
+An incremental build compares against it and re-renders or re-copies only
+what changed, and deletes outputs whose source is gone. It runs the same code
+as a clean build, so the output is byte-identical. If the manifest is missing
+or was written by a different version of the builder, it does a clean build.
 """
 
+import argparse
+import gzip
+import hashlib
+import json
 import os
 import shutil
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from xml.sax.saxutils import escape
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, meta
 import markdown
 import yaml
 
+from images import available_formats, build_derivatives, rewrite_images
+from minify import minify_css, minify_html, minify_js
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Set up Jinja2 environment. Autoescaping keeps a title or description
 # containing & or " from breaking the meta tags it gets rendered into;
 # the converted Markdown is passed through with `| safe`.
@@ -37,21 +63,130 @@ OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'docs
 # Canonical origin, used for canonical tags, og:url and the sitemap
 SITE_URL = 'https://dinkydash.co'
 
+# Input hashes of the last build, for --incremental. Kept out of OUTPUT_DIR so
+# it never gets published.
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.build-manifest.json')
+
+# Scripts whose code shapes the output; editing one invalidates the manifest.
+BUILDER_SOURCES = ['build.py', 'minify.py', 'images.py']
+
+# Outputs worth precompressing. Images are already compressed.
+COMPRESSIBLE = {'.html', '.css', '.js', '.xml', '.txt', '.svg', '.json'}
+
+
+def split_front_matter(text):
+    content = text.split('---', 2)
+    if len(content) > 2:
+        return yaml.safe_load(content[1]), content[2]
+    return {}, content[0]
+
+
+def hash_bytes(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    with open(path, 'rb') as f:
+        return hash_bytes(f.read())
+
+
+def template_chain(template_name, seen=None):
+    """Return every template `template_name` renders through, itself included.
+
+    Follows extends/include/import. A template name computed at render time
+    can't be resolved statically, so then every template counts.
+    """
+    seen = set() if seen is None else seen
+    if template_name in seen:
+        return seen
+    seen.add(template_name)
+    source = env.loader.get_source(env, template_name)[0]
+    for referenced in meta.find_referenced_templates(env.parse(source)):
+        if referenced is None:
+            seen.update(env.list_templates())
+            return seen
+        template_chain(referenced, seen)
+    return seen
+
 
-def read_markdown(filename):
-    with open(filename, 'r') as file:
-        content = file.read().split('---', 2)
-        if len(content) > 2:
-            front_matter = yaml.safe_load(content[1])
-            markdown_content = content[2]
-        else:
-            front_matter = {}
-            markdown_content = content[0]
-        return front_matter, markdown.markdown(markdown_content, extensions=['fenced_code', 'tables'])
+def template_chain_hash(template_name):
+    return hash_bytes(*(
+        name + ':' + hash_file(os.path.join('templates', name))
+        for name in sorted(template_chain(template_name))
+    ))
 
 
-def git_last_modified(file_path):
-    """Return the file's last commit date as YYYY-MM-DD, or None if unavailable.
+def builder_hash():
+    """Hash of the build scripts. Any change invalidates the whole manifest."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return hash_bytes(*(hash_file(os.path.join(here, name)) for name in BUILDER_SOURCES),
+                      'brotli' if brotli else '', json.dumps(available_formats()))
+
+
+def compressed_siblings(path):
+    return [path + '.gz', path + '.br']
+
+
+def write_compressed(path, data):
+    """Write .gz/.br copies of `data` beside `path` for compressible types."""
+    if os.path.splitext(path)[1] not in COMPRESSIBLE:
+        return
+    # mtime=0 keeps the .gz byte-identical between builds
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data))
+
+
+def write_output(relative_path, text):
+    """Write `text` to OUTPUT_DIR/relative_path, plus its compressed copies."""
+    path = os.path.join(OUTPUT_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = text.encode()
+    with open(path, 'wb') as f:
+        f.write(data)
+    write_compressed(path, data)
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get('builder') != builder_hash():
+        return {}
+    return manifest
+
+
+def save_manifest(manifest):
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def git_head():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return result.stdout.strip()
+
+
+def git_last_modified_dates():
+    """Map each committed path under this directory to its last commit date.
+
+    Dates are YYYY-MM-DD; paths are relative to the website directory, like
+    the source paths the build uses. One walk over the history replaces a
+    `git log` per file. Returns {} if git is unavailable.
 
     Uses the commit date rather than the filesystem mtime, which would just be
     the checkout time on a fresh clone. Uncommitted edits are not reflected,
@@ -59,15 +194,25 @@ def git_last_modified(file_path):
     """
     try:
         result = subprocess.run(
-            ['git', 'log', '-1', '--format=%cs', '--', file_path],
+            ['git', '-c', 'core.quotePath=false', 'log', '--format=%x00%cs',
+             '--name-only', '--relative', '--', '.'],
             capture_output=True, text=True, check=True,
         )
     except (subprocess.CalledProcessError, FileNotFoundError):
-        return None
-    return result.stdout.strip() or None
+        return {}
+    dates = {}
+    commit_date = None
+    # Newest commit first, so the first date seen for a path is its latest.
+    for line in result.stdout.splitlines():
+        if line.startswith('\0'):
+            commit_date = line[1:]
+        elif line and line not in dates:
+            dates[line] = commit_date
+    return dates
 
 
 def generate_sitemap(pages):
+    last_modified = git_last_modified_dates()
     lines = [
         '<?xml version="1.0" encoding="UTF-8"?>',
         '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
@@ -77,14 +222,13 @@ def generate_sitemap(pages):
         lines.append(f'    <loc>{escape(SITE_URL + url_path)}</loc>')
         # A page's real content is its Markdown plus the template rendering it —
         # the home page in particular lives almost entirely in its template.
-        dates = [d for d in (git_last_modified(f) for f in source_files) if d]
+        dates = [last_modified[f] for f in source_files if f in last_modified]
         if dates:
             lines.append(f'    <lastmod>{max(dates)}</lastmod>')
         lines.append('  </url>')
     lines.append('</urlset>')
 
-    with open(os.path.join(OUTPUT_DIR, 'sitemap.xml'), 'w') as f:
-        f.write('\n'.join(lines) + '\n')
+    write_output('sitemap.xml', '\n'.join(lines) + '\n')
 
 
 def generate_robots():
@@ -93,88 +237,248 @@ Allow: /
 
 Sitemap: {SITE_URL}/sitemap.xml
 """
-    with open(os.path.join(OUTPUT_DIR, 'robots.txt'), 'w') as f:
-        f.write(content)
-
+    write_output('robots.txt', content)
 
-def copy_images():
-    if os.path.exists('images'):
-        output_image_dir = os.path.join(OUTPUT_DIR, 'images')
-        if os.path.exists(output_image_dir):
-            shutil.rmtree(output_image_dir)
-        shutil.copytree('images', output_image_dir)
 
+def find_copied_files():
+    """Return (source, output) pairs for files copied verbatim, output relative
+    to OUTPUT_DIR.
 
-def copy_static():
-    """Copy static/ to the site root.
-
-    These are files that have to sit at the root to work: browsers request
+    images/ keeps its layout under /images/. static/ goes to the site root:
+    these are files that have to sit there to work — browsers request
     /favicon.ico without being told to, and iOS looks for /apple-touch-icon.png.
     """
-    if not os.path.exists('static'):
-        return
-    for name in sorted(os.listdir('static')):
-        source = os.path.join('static', name)
-        if os.path.isfile(source):
-            shutil.copy2(source, os.path.join(OUTPUT_DIR, name))
-
-
-def generate_pages():
-    """Render every Markdown file.
-
-    Returns (sitemap_pages, written_count). These differ because `noindex`
-    pages are still rendered, just kept out of the sitemap.
+    pairs = []
+    for root, dirs, files in os.walk('images'):
+        for name in files:
+            source = os.path.join(root, name)
+            pairs.append((source, source))
+    if os.path.exists('static'):
+        for name in sorted(os.listdir('static')):
+            source = os.path.join('static', name)
+            if os.path.isfile(source):
+                pairs.append((source, name))
+    return sorted(pairs)
+
+
+def find_pages():
+    """Locate every Markdown page and work out where it will be written.
+
+    Returns dicts with the source path and text, the output path relative to
+    OUTPUT_DIR, the clean URL it is served at, and its front matter.
     """
-    # Ensure output directory exists
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
     pages = []
-    written = 0
-
     for root, dirs, files in os.walk('content'):
         for file in files:
             if file.endswith('.md'):
                 file_path = os.path.join(root, file)
-                front_matter, content = read_markdown(file_path)
+                with open(file_path, 'r') as f:
+                    text = f.read()
+                front_matter, _ = split_front_matter(text)
 
-                # Determine output path and the clean URL it will be served at
                 rel_path = os.path.relpath(file_path, 'content')
                 base_name = os.path.splitext(rel_path)[0]
 
                 if base_name == 'index':
                     # For index.md, keep it at the root of its directory
-                    output_path = os.path.join(OUTPUT_DIR, os.path.dirname(rel_path), 'index.html')
+                    output = os.path.join(os.path.dirname(rel_path), 'index.html')
                     url_path = '/'
                 else:
                     # For other files, create a subdirectory
-                    output_path = os.path.join(OUTPUT_DIR, base_name, 'index.html')
+                    output = os.path.join(base_name, 'index.html')
                     url_path = '/' + base_name.replace(os.sep, '/') + '/'
 
-                template_name = front_matter.get('template', 'page.html')
-                template = env.get_template(template_name)
-
-                output = template.render(
-                    content=content,
-                    canonical_url=SITE_URL + url_path,
-                    **front_matter,
-                )
+                pages.append({
+                    'source': file_path,
+                    'text': text,
+                    'output': output,
+                    'url_path': url_path,
+                    'front_matter': front_matter,
+                    'template': front_matter.get('template', 'page.html'),
+                })
+    return sorted(pages, key=lambda p: p['source'])
 
-                # Ensure output directory exists
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-                # Write output
-                with open(output_path, 'w') as f:
-                    f.write(output)
-                written += 1
+def build_assets(old_manifest, manifest):
+    """Minify assets/ into OUTPUT_DIR/assets under content-hashed names.
 
-                # `noindex: true` pages stay out of the sitemap and carry a
-                # robots meta tag. Used for pages whose content only exists once
-                # query parameters are supplied — indexing the bare URL would
-                # just add a thin page.
-                if not front_matter.get('noindex'):
-                    pages.append((url_path, (file_path, os.path.join('templates', template_name))))
+    The hash in the name lets the files be cached forever: a change produces
+    a new URL. Returns {name: url} for the templates' asset() function.
+    """
+    previous = old_manifest.get('assets', {})
+    minifiers = {'.css': minify_css, '.js': minify_js}
+    urls = {}
+    if not os.path.exists('assets'):
+        return urls
+    for name in sorted(os.listdir('assets')):
+        source = os.path.join('assets', name)
+        stem, ext = os.path.splitext(name)
+        with open(source) as f:
+            text = minifiers.get(ext, lambda t: t)(f.read())
+        digest = hash_bytes(text)
+        output = os.path.join('assets', f'{stem}.{digest[:10]}{ext}')
+        entry = {'hash': digest, 'output': output}
+        if previous.get(source) != entry or not os.path.exists(os.path.join(OUTPUT_DIR, output)):
+            write_output(output, text)
+        manifest['assets'][source] = entry
+        urls[name] = '/' + output
+    return urls
+
+
+def render_page(page, asset_urls, pictures):
+    front_matter, markdown_content = split_front_matter(page['text'])
+    content = markdown.markdown(markdown_content, extensions=['fenced_code', 'tables'])
+    template = env.get_template(page['template'])
+    return minify_html(rewrite_images(template.render(
+        content=content,
+        canonical_url=SITE_URL + page['url_path'],
+        asset=asset_urls.__getitem__,
+        **front_matter,
+    ), pictures))
+
+
+def generate_pages(old_manifest, manifest, asset_urls, pictures, jobs=None):
+    """Render every Markdown file whose inputs changed since `old_manifest`.
+
+    Records each page's input hash in `manifest`. Rendering runs in a pool of
+    `jobs` processes (default: one per CPU). Returns (sitemap_pages,
+    written_count). These differ because `noindex` pages are still rendered,
+    just kept out of the sitemap.
+    """
+    # Ensure output directory exists
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    return pages, written
+    previous = old_manifest.get('pages', {})
+    chain_hashes = {}
+    # Pages embed asset URLs and image srcsets, so a changed asset or image
+    # means a changed page.
+    assets_hash = hash_bytes(json.dumps([asset_urls, pictures], sort_keys=True))
+    pages = []
+    to_render = []
+
+    for page in find_pages():
+        template_name = page['template']
+        if template_name not in chain_hashes:
+            chain_hashes[template_name] = template_chain_hash(template_name)
+        input_hash = hash_bytes(page['text'], chain_hashes[template_name], assets_hash)
+        output_path = os.path.join(OUTPUT_DIR, page['output'])
+
+        entry = {'hash': input_hash, 'output': page['output']}
+        if previous.get(page['source']) != entry or not os.path.exists(output_path):
+            to_render.append(page)
+        manifest['pages'][page['source']] = entry
+
+        # `noindex: true` pages stay out of the sitemap and carry a
+        # robots meta tag. Used for pages whose content only exists once
+        # query parameters are supplied — indexing the bare URL would
+        # just add a thin page.
+        if not page['front_matter'].get('noindex'):
+            pages.append((page['url_path'], (page['source'], os.path.join('templates', template_name))))
+
+    render = partial(render_page, asset_urls=asset_urls, pictures=pictures)
+    jobs = min(jobs or os.cpu_count() or 1, len(to_render))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            outputs = list(pool.map(render, to_render))
+    else:
+        outputs = [render(page) for page in to_render]
+
+    for page, output in zip(to_render, outputs):
+        write_output(page['output'], output)
+
+    return pages, len(to_render)
+
+
+def copy_files(old_manifest, manifest):
+    """Copy images and static files whose content changed. Returns the count."""
+    previous = old_manifest.get('files', {})
+    copied = 0
+    for source, output in find_copied_files():
+        entry = {'hash': hash_file(source), 'output': output}
+        output_path = os.path.join(OUTPUT_DIR, output)
+        if previous.get(source) != entry or not os.path.exists(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.copy2(source, output_path)
+            with open(source, 'rb') as f:
+                write_compressed(output_path, f.read())
+            copied += 1
+        manifest['files'][source] = entry
+    return copied
+
+
+def entry_outputs(entry):
+    return entry['outputs'] if 'outputs' in entry else [entry['output']]
+
+
+def remove_stale_outputs(old_manifest, manifest):
+    """Delete outputs whose source no longer exists. Returns the count."""
+    kinds = ('pages', 'files', 'assets', 'images')
+    current = {
+        output for kind in kinds
+        for entry in manifest[kind].values() for output in entry_outputs(entry)
+    }
+    removed = 0
+    for kind in kinds:
+        stale = [
+            output for entry in old_manifest.get(kind, {}).values()
+            for output in entry_outputs(entry) if output not in current
+        ]
+        for output in stale:
+            output_path = os.path.join(OUTPUT_DIR, output)
+            if os.path.exists(output_path):
+                os.remove(output_path)
+                removed += 1
+            for sibling in compressed_siblings(output_path):
+                if os.path.exists(sibling):
+                    os.remove(sibling)
+            # Drop directories the removal emptied, e.g. about/ for about.md
+            parent = os.path.dirname(output_path)
+            while parent != OUTPUT_DIR and os.path.isdir(parent) and not os.listdir(parent):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+    return removed
+
+
+def build(incremental=False, jobs=None):
+    # Without a manifest from this builder there is no telling which outputs
+    # are stale, so an incremental build falls back to a clean one.
+    old_manifest = load_manifest() if incremental else {}
+    clean = not old_manifest
+    if clean:
+        # Preserve CNAME content
+        cname_content = preserve_cname()
+
+        # Clear the output directory if it exists
+        if os.path.exists(OUTPUT_DIR):
+            shutil.rmtree(OUTPUT_DIR)
+
+    manifest = {'builder': builder_hash(), 'pages': {}, 'files': {}, 'assets': {}}
+
+    asset_urls = build_assets(old_manifest, manifest)
+    manifest['images'], pictures = build_derivatives(
+        [(s, o) for s, o in find_copied_files() if s.startswith('images' + os.sep)],
+        old_manifest.get('images', {}), hash_file, OUTPUT_DIR,
+    )
+    pages, written = generate_pages(old_manifest, manifest, asset_urls, pictures, jobs)
+
+    # lastmod values come from commit dates, so the sitemap can only change
+    # when the page list or HEAD does.
+    manifest['sitemap'] = hash_bytes(json.dumps(sorted(pages)), git_head() or '')
+    sitemap_path = os.path.join(OUTPUT_DIR, 'sitemap.xml')
+    if old_manifest.get('sitemap') != manifest['sitemap'] or not os.path.exists(sitemap_path):
+        generate_sitemap(pages)
+    if not os.path.exists(os.path.join(OUTPUT_DIR, 'robots.txt')) or not old_manifest:
+        generate_robots()
+
+    copied = copy_files(old_manifest, manifest)
+    removed = remove_stale_outputs(old_manifest, manifest)
+
+    if clean:
+        # Restore CNAME file
+        restore_cname(cname_content)
+
+    save_manifest(manifest)
+    return pages, written, copied, removed
 
 
 def preserve_cname():
@@ -194,21 +498,15 @@ def restore_cname(cname_content):
 
 
 if __name__ == '__main__':
-    # Preserve CNAME content
-    cname_content = preserve_cname()
-
-    # Clear the output directory if it exists
-    if os.path.exists(OUTPUT_DIR):
-        shutil.rmtree(OUTPUT_DIR)
-
-    pages, written = generate_pages()
-    generate_sitemap(pages)
-    generate_robots()
-    copy_images()
-    copy_static()
+    parser = argparse.ArgumentParser(description='Build the DinkyDash website into ../docs.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only rebuild what changed since the last build')
+    parser.add_argument('--jobs', type=int,
+                        help='processes to render pages with (default: one per CPU)')
+    args = parser.parse_args()
 
-    # Restore CNAME file
-    restore_cname(cname_content)
+    pages, written, copied, removed = build(incremental=args.incremental, jobs=args.jobs)
 
     print(f"Site generated in {OUTPUT_DIR} "
-          f"({written} pages, {len(pages)} in sitemap)")
\ No newline at end of file
+          f"({written} pages written, {copied} files copied, {removed} removed, "
+          f"{len(pages)} pages in sitemap)")
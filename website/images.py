@@ -0,0 +1,156 @@
+"""
+Responsive image derivatives for the website build.
+
+Every image in images/ is re-encoded as AVIF and WebP at a few widths, and
+<img> tags pointing at it are rewritten into <picture> elements with srcset,
+so a phone downloads a small WebP/AVIF instead of the full-size PNG. The
+original stays as the <img> fallback.
+
+Encoding is slow, so results are cached in .image-cache/ under the source
+file's hash: an image is only encoded again when its bytes change, even
+across clean builds.
+
+Pillow is optional. Without it (or without AVIF support in it) the build
+still works, just without those derivatives.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.image-cache')
+
+# Phone, tablet/desktop 1x, and the source itself for 2x screens. Widths
+# larger than the source are skipped — upscaling only adds bytes.
+WIDTHS = [480, 960]
+
+# Content column is 980px wide with 24px padding each side.
+SIZES = '(max-width: 980px) calc(100vw - 48px), 932px'
+
+# (mime type, extension, Pillow save options), best format first: browsers
+# take the first <source> they support.
+FORMATS = [
+    ('image/avif', 'avif', {'quality': 55, 'speed': 6}),
+    ('image/webp', 'webp', {'quality': 80, 'method': 6}),
+]
+
+RESIZABLE = {'.png', '.jpg', '.jpeg'}
+
+
+def available_formats():
+    if Image is None:
+        return []
+    return [f for f in FORMATS if features.check(f[1])]
+
+
+def _cache_key(source_hash):
+    """Cache directory name: the source hash plus the encoder settings."""
+    settings = json.dumps([WIDTHS, available_formats()], sort_keys=True)
+    return source_hash[:32] + '-' + hashlib.sha256(settings.encode()).hexdigest()[:12]
+
+
+def _encode(source, source_hash):
+    """Encode every derivative of `source` into the cache; return its metadata."""
+    cache = os.path.join(CACHE_DIR, _cache_key(source_hash))
+    meta_path = os.path.join(cache, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f)
+
+    os.makedirs(cache, exist_ok=True)
+    with Image.open(source) as im:
+        im.load()
+        width, height = im.size
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA' if 'transparency' in im.info else 'RGB')
+        widths = sorted({w for w in WIDTHS if w < width} | {width})
+        files = []
+        for w in widths:
+            resized = im if w == width else im.resize(
+                (w, round(height * w / width)), Image.LANCZOS)
+            for mime, ext, options in available_formats():
+                name = f'{w}.{ext}'
+                resized.save(os.path.join(cache, name), **options)
+                files.append({'mime': mime, 'width': w, 'name': name})
+
+    meta = {'width': width, 'height': height, 'files': files}
+    # Written last, so an interrupted encode is redone next time.
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def build_derivatives(pairs, old_entries, hash_file, output_dir):
+    """Encode and publish derivatives for (source, output) image pairs.
+
+    Returns (entries, pictures): manifest entries per source, and, per
+    published image URL, what rewrite_images() needs to build its <picture>.
+    """
+    entries = {}
+    pictures = {}
+    if not available_formats():
+        return entries, pictures
+
+    for source, output in pairs:
+        stem, ext = os.path.splitext(output)
+        if ext.lower() not in RESIZABLE:
+            continue
+        source_hash = hash_file(source)
+        meta = _encode(source, source_hash)
+
+        outputs = []
+        srcsets = {}
+        for file in meta['files']:
+            name = f"{stem}-{file['width']}w.{file['name'].split('.')[-1]}"
+            outputs.append(name)
+            srcsets.setdefault(file['mime'], []).append(f"/{name} {file['width']}w")
+            target = os.path.join(output_dir, name)
+            previous = old_entries.get(source)
+            if not previous or previous['hash'] != source_hash or not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(CACHE_DIR, _cache_key(source_hash), file['name']), target)
+
+        entries[source] = {'hash': source_hash, 'outputs': outputs}
+        pictures['/' + output.replace(os.sep, '/')] = {
+            'width': meta['width'],
+            'height': meta['height'],
+            'sources': [(mime, ', '.join(srcsets[mime]))
+                        for mime, _, _ in available_formats() if mime in srcsets],
+        }
+    return entries, pictures
+
+
+_IMG = re.compile(r'<img\b[^>]*>', re.I)
+_SRC = re.compile(r'\bsrc="([^"]+)"')
+
+
+def rewrite_images(page_html, pictures):
+    """Wrap each <img> of a known image in a <picture> with srcset sources."""
+    def replace(match):
+        tag = match.group()
+        src = _SRC.search(tag)
+        picture = pictures.get(src.group(1)) if src else None
+        if picture is None:
+            return tag
+        # Explicit dimensions let the browser reserve space before the image
+        # arrives, so the text doesn't jump when it loads.
+        if 'width=' not in tag:
+            end = -2 if tag.endswith('/>') else -1
+            tag = (tag[:end].rstrip() +
+                   f' width="{picture["width"]}" height="{picture["height"]}"'
+                   ' decoding="async"' + tag[end:])
+        sources = ''.join(
+            f'<source type="{mime}" srcset="{html.escape(srcset)}" sizes="{SIZES}">'
+            for mime, srcset in picture['sources']
+        )
+        return f'<picture>{sources}{tag}</picture>'
+
+    return _IMG.sub(replace, page_html)
@@ -0,0 +1,109 @@
+"""
+Conservative HTML/CSS/JS minification for the website build.
+
+Stdlib only, so the build keeps needing nothing beyond Jinja2, Markdown and
+PyYAML. It only removes what is provably insignificant — comments,
+indentation, whitespace next to CSS punctuation — rather than rewriting code
+the way a real JS minifier would. Most of the weight in these pages is
+indentation and comments, so that gets nearly all of the win. It cannot
+break a script.
+"""
+
+import json
+import re
+
+# Strings and comments first so nothing inside them is touched.
+_CSS_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*"'
+    r"|'(?:\\.|[^'\\])*'"
+    r'|/\*.*?\*/'
+    r'|\s+'
+    r'|[{};,>:]'
+    r'|[^"\'/\s{};,>:]+'
+    r'|/',
+    re.S,
+)
+
+# Whitespace next to these never matters. A colon only sheds the space after
+# it: `a :hover` and `a:hover` are different selectors.
+_CSS_NO_SPACE_BEFORE = set('{};,>')
+_CSS_NO_SPACE_AFTER = set('{};,>:')
+
+
+def minify_css(css):
+    out = []
+    pending_space = False
+    for match in _CSS_TOKEN.finditer(css):
+        token = match.group()
+        if token.isspace() or token.startswith('/*'):
+            pending_space = True
+            continue
+        if (pending_space and out and out[-1][-1] not in _CSS_NO_SPACE_AFTER
+                and token[0] not in _CSS_NO_SPACE_BEFORE):
+            out.append(' ')
+        pending_space = False
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+    return ''.join(out)
+
+
+def minify_js(js):
+    """Drop indentation, blank lines and whole-line // comments.
+
+    Line breaks are kept, so automatic semicolon insertion behaves exactly
+    as before.
+    """
+    lines = []
+    for line in js.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+    return '\n'.join(lines)
+
+
+_RAW_ELEMENT = re.compile(
+    r'(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)', re.S | re.I
+)
+_HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _collapse(match):
+    # Keep one newline where there was one, which keeps the output readable
+    # and is rendered the same as a space.
+    return '\n' if '\n' in match.group() else ' '
+
+
+def _minify_text(html):
+    html = _HTML_COMMENT.sub('', html)
+    return _WHITESPACE.sub(_collapse, html)
+
+
+def _minify_raw(open_tag, name, body):
+    name = name.lower()
+    if name == 'style':
+        return minify_css(body)
+    if name == 'script':
+        if 'src=' in open_tag:
+            return body
+        if 'application/ld+json' in open_tag:
+            try:
+                return json.dumps(json.loads(body), ensure_ascii=False, separators=(',', ':'))
+            except ValueError:
+                return body
+        return minify_js(body)
+    # <pre> and <textarea> render their whitespace.
+    return body
+
+
+def minify_html(html):
+    out = []
+    position = 0
+    for match in _RAW_ELEMENT.finditer(html):
+        out.append(_minify_text(html[position:match.start()]))
+        open_tag, name, body, close_tag = match.groups()
+        out.append(open_tag + _minify_raw(open_tag, name, body) + close_tag)
+        position = match.end()
+    out.append(_minify_text(html[position:]))
+    return ''.join(out).strip() + '\n'
@@ -0,0 +1,12 @@
+"""
+Production WSGI entry point for the DinkyDash dashboard.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported and warmed once in the gunicorn master (preload_app), so
+every worker forks with the template compiled and the payload parsed.
+"""
+
+from app import app, warm_up
+
+warm_up()